@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import heapq
+from typing import Any, Callable
+
+from assignments.core import Assignment, RaidOverfull
+from roster import Raider
+
+
+class GroupBalancer:
+    """Hands out the group with the lowest `key`, ties going to the earlier group.
+
+    Keys live in a heap and are refreshed lazily: adding through the
+    balancer, or calling `refresh` after changing a group directly, pushes
+    the group's new key and the old entry is skipped when it comes up.
+    Groups at their capacity drop out until they are refreshed with room.
+    Placing n raiders over g groups is O(n log g).
+    """
+
+    def __init__(self, groups: dict[str, Assignment], key: Callable[[Assignment], Any] = len, capacity: int | dict[str, int] | None = None):
+        self.groups = groups
+        self.key = key
+        if capacity is None or isinstance(capacity, int):
+            capacity = {name: capacity for name in groups}
+        self.capacity = capacity
+        self._order = {name: i for i, name in enumerate(groups)}
+        self._versions = dict.fromkeys(groups, 0)
+        self._heap = [(key(group), self._order[name], 0, name) for name, group in groups.items() if not self.is_full(name)]
+        heapq.heapify(self._heap)
+
+    def is_full(self, name: str) -> bool:
+        capacity = self.capacity.get(name)
+        return capacity is not None and len(self.groups[name]) >= capacity
+
+    def refresh(self, name: str) -> None:
+        self._versions[name] += 1
+        if not self.is_full(name):
+            heapq.heappush(self._heap, (self.key(self.groups[name]), self._order[name], self._versions[name], name))
+
+    def peek(self) -> str:
+        while self._heap:
+            _, _, version, name = self._heap[0]
+            if version == self._versions[name]:
+                return name
+            heapq.heappop(self._heap)
+        raise RaidOverfull(f'every group of {", ".join(self.groups)} is full')
+
+    def add(self, raider: Raider, name: str | None = None) -> str:
+        """Add `raider` to `name`, or to the group with the lowest key, and return the group."""
+        name = name or self.peek()
+        self.groups[name].append(raider)
+        self.refresh(name)
+        return name
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+
+SOLUTION_CACHE_FILE = '.solution_cache.sqlite'
+MAX_ENTRIES = 1000
+
+
+class SolutionCache:
+    """Solved boss ranges in SQLite, keyed by the boss's fingerprint.
+
+    Reads stamp an entry as used, and writes evict the least recently used
+    entries past `max_entries`. Each thread gets its own connection, and the
+    database is in WAL mode so worker processes can share the file.
+    """
+
+    def __init__(self, path: str = SOLUTION_CACHE_FILE, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connect().execute('CREATE TABLE IF NOT EXISTS solutions (key TEXT PRIMARY KEY, cells TEXT NOT NULL, used REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def __getstate__(self) -> dict:
+        # connections stay with their process, a copy opens its own
+        return {'path': self.path, 'max_entries': self.max_entries}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    def get(self, key: str) -> list[list[str]] | None:
+        connection = self._connect()
+        row = connection.execute('SELECT cells FROM solutions WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        with connection:
+            connection.execute('UPDATE solutions SET used = ? WHERE key = ?', (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, cells: list[list[str]]) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)', (key, json.dumps(cells), time.time()))
+            connection.execute(
+                'DELETE FROM solutions WHERE key IN (SELECT key FROM solutions ORDER BY used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._connect() as connection:
+            connection.execute('DELETE FROM solutions')
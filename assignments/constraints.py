@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import dataclasses
+import itertools
+import logging
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+from assignments.scoring import CountTerm, LocalSearch, ScoreModel
+from roster import Raider
+
+LOGGER = logging.getLogger(__name__)
+
+INFEASIBLE = float('inf')
+NODE_LIMIT = 2_000
+POLISH_STEPS = 20_000
+
+
+class Unsatisfiable(Exception):
+    """No grouping meets the hard constraints, `constraint` names the one that can't be met."""
+
+    def __init__(self, constraint: str, message: str):
+        super().__init__(message)
+        self.constraint = constraint
+
+
+class _OutOfBudget(Exception):
+    pass
+
+
+@dataclass
+class CountConstraint:
+    """Between `at_least` and `at_most` raiders matching `predicate` in `group`.
+
+    Hard unless `weight` is set, then every raider short of `at_least` costs
+    `weight` instead. `at_most` is always hard.
+    """
+    name: str
+    group: str
+    predicate: Callable[[Raider], bool]
+    at_least: int = 0
+    at_most: int | None = None
+    weight: float | None = None
+
+    @property
+    def hard(self) -> bool:
+        return self.weight is None
+
+
+class GroupSolver:
+    """Split raiders into named groups of limited capacity.
+
+    Preferences add a cost per raider and group, INFEASIBLE rules the group
+    out. `size_costs[group][k]` is the cost of the group's k+1th member; it
+    must not decrease with k, the last value repeats. Pinned raiders count
+    toward sizes and constraints but never move. A limit the pinned raiders
+    already break is raised to what is pinned, so no more are added.
+
+    The search is depth first branch and bound over the unpinned raiders,
+    most constrained raider and cheapest group first, with forward checking
+    of the hard constraints. It gives up after `node_limit` nodes, and then
+    anneals the best grouping found so far for `polish_steps` steps with the
+    same objective. Both budgets are counts rather than time, so the same
+    input always gives the same grouping.
+    """
+
+    def __init__(self, capacities: dict[str, int], node_limit: int = NODE_LIMIT, polish_steps: int = POLISH_STEPS):
+        self.capacities = capacities
+        self.node_limit = node_limit
+        self.polish_steps = polish_steps
+        self.constraints: list[CountConstraint] = []
+        self.size_costs: dict[str, list[float]] = {}
+        self._preferences: list[Callable[[Raider, str], float]] = []
+        self._pinned: dict[str, list[Raider]] = {group: [] for group in capacities}
+
+    def pin(self, group: str, raider: Raider) -> None:
+        self._pinned[group].append(raider)
+
+    def prefer(self, cost: Callable[[Raider, str], float]) -> None:
+        self._preferences.append(cost)
+
+    def size_cost(self, group: str, costs: list[float]) -> None:
+        self.size_costs[group] = costs
+
+    def at_least(self, group: str, predicate: Callable[[Raider], bool], count: int = 1, weight: float | None = None, name: str | None = None) -> None:
+        self.constraints.append(CountConstraint(name or f'at least {count} in {group}', group, predicate, at_least=count, weight=weight))
+
+    def at_most(self, group: str, predicate: Callable[[Raider], bool], count: int, name: str | None = None) -> None:
+        self.constraints.append(CountConstraint(name or f'at most {count} in {group}', group, predicate, at_most=count))
+
+    def _loosen(self) -> None:
+        """Raise limits the pinned raiders already break, e.g. after a hand edit, to what is pinned."""
+        for k, c in enumerate(self.constraints):
+            pinned = sum(1 for raider in self._pinned[c.group] if c.predicate(raider))
+            if c.at_most is not None and pinned > c.at_most:
+                LOGGER.warning(f'{c.name}: {pinned} already in {c.group}, over the limit of {c.at_most}')
+                self.constraints[k] = dataclasses.replace(c, at_most=pinned)
+
+    def solve(self, raiders: Iterable[Raider]) -> dict[str, list[Raider]]:
+        """Group `raiders`, returning the raiders newly placed in each group."""
+        self._loosen()
+        pinned = {id(raider) for members in self._pinned.values() for raider in members}
+        raiders = [raider for raider in raiders if id(raider) not in pinned]
+        solution, complete = self._search(raiders, self.constraints)
+        if solution is None:
+            raise self._diagnose(raiders, complete)
+        groups = {group: [] for group in self.capacities}
+        for raider, group in zip(raiders, solution):
+            groups[group].append(raider)
+        if not complete and self.polish_steps:
+            groups = LocalSearch(self.model(), groups, seed=0).run(self.polish_steps)
+        return groups
+
+    def score(self) -> float:
+        """The objective of the pinned raiders as they stand, e.g. a finished boss pinned back in."""
+        model = self.model()
+        pinned, model.pinned = model.pinned, {}
+        return model.score(pinned)
+
+    def model(self) -> ScoreModel:
+        """The objective as a ScoreModel, with the hard constraints as INFEASIBLE counts."""
+        self._loosen()
+        terms = []
+        for group, capacity in self.capacities.items():
+            increments = self.size_costs.get(group)
+            if increments:
+                costs = [0]
+                for k in range(capacity):
+                    costs.append(costs[-1] + increments[min(k, len(increments) - 1)])
+                terms.append(CountTerm(f'size of {group}', lambda raider: True, costs, (group,)))
+        for c in self.constraints:
+            costs = []
+            for k in range(c.at_most + 2 if c.at_most is not None else c.at_least + 1):
+                if c.at_most is not None and k > c.at_most:
+                    costs.append(INFEASIBLE)
+                elif k < c.at_least:
+                    costs.append(INFEASIBLE if c.hard else c.weight * (c.at_least - k))
+                else:
+                    costs.append(0)
+            terms.append(CountTerm(c.name, c.predicate, costs, (c.group,)))
+        preferences = self._preferences
+        return ScoreModel(
+            self.capacities,
+            preference=lambda raider, group: sum(prefer(raider, group) for prefer in preferences),
+            terms=terms,
+            pinned=self._pinned,
+        )
+
+    def _search(self, raiders: list[Raider], constraints: list[CountConstraint]) -> tuple[list[str] | None, bool]:
+        names = list(self.capacities)
+        group_count = len(names)
+        capacity = [self.capacities[name] for name in names]
+        size = [len(self._pinned[name]) for name in names]
+        increments = []
+        for name, cap in zip(names, capacity):
+            costs = self.size_costs.get(name) or [0]
+            increments.append([costs[min(k, len(costs) - 1)] for k in range(cap)])
+        has_size_costs = any(any(x) for x in increments)
+
+        by_group = [[k for k, c in enumerate(constraints) if c.group == name] for name in names]
+        count = [sum(1 for raider in self._pinned[c.group] if c.predicate(raider)) for c in constraints]
+        if any(c.at_most is not None and count[k] > c.at_most for k, c in enumerate(constraints)):
+            return None, True
+        hard_min = [k for k, c in enumerate(constraints) if c.hard and c.at_least]
+
+        n = len(raiders)
+        costs = [[sum(prefer(raider, name) for prefer in self._preferences) for name in names] for raider in raiders]
+        matches = [[c.predicate(raider) for c in constraints] for raider in raiders]
+        domains = [[g for g in range(group_count) if costs[i][g] < INFEASIBLE and capacity[g] > 0] for i in range(n)]
+        if any(not domain for domain in domains):
+            return None, True
+
+        # most constrained first, identical raiders next to each other
+        signatures = [(tuple(costs[i]), tuple(matches[i])) for i in range(n)]
+        order = sorted(range(n), key=lambda i: (len(domains[i]), -sum(matches[i][k] for k in hard_min), signatures[i]))
+        previous_same = [-1] * n
+        for pos in range(1, n):
+            if signatures[order[pos]] == signatures[order[pos - 1]]:
+                previous_same[pos] = pos - 1
+
+        group_of = [names.index(c.group) for c in constraints]
+        soft = [k for k, c in enumerate(constraints) if not c.hard]
+        candidate_for = [[k for k in hard_min + soft if matches[i][k] and group_of[k] in domains[i]] for i in range(n)]
+        candidates = [sum(1 for i in range(n) if k in candidate_for[i]) for k in range(len(constraints))]
+
+        # static bounds on what the remaining raiders add and can win back from soft constraints
+        lower = [0.0] * (n + 1)
+        bonus = [0.0] * (n + 1)
+        for pos in range(n - 1, -1, -1):
+            i = order[pos]
+            lower[pos] = lower[pos + 1] + min(costs[i][g] for g in domains[i])
+            bonus[pos] = bonus[pos + 1] + max(sum(constraints[k].weight for k in by_group[g] if k in soft and matches[i][k]) for g in domains[i])
+
+        start = sum(sum(increments[g][:size[g]]) for g in range(group_count))
+        start += sum(constraints[k].weight * max(0, constraints[k].at_least - count[k]) for k in soft)
+
+        def bound(pos: int) -> float:
+            remaining = n - pos
+            total = lower[pos]
+            if soft:
+                total -= min(bonus[pos], sum(constraints[k].weight * min(max(0, constraints[k].at_least - count[k]), candidates[k]) for k in soft))
+            if remaining and has_size_costs:
+                future = []
+                for g in range(group_count):
+                    future.extend(increments[g][size[g]:])
+                future.sort()
+                total += sum(future[:remaining])
+            return total
+
+        def feasible(remaining: int) -> bool:
+            if sum(capacity) - sum(size) < remaining:
+                return False
+            for k in hard_min:
+                deficit = constraints[k].at_least - count[k]
+                if deficit > 0 and (deficit > candidates[k] or deficit > capacity[group_of[k]] - size[group_of[k]]):
+                    return False
+            return True
+
+        def options(i: int, floor: int) -> list[tuple[float, int]]:
+            """Groups raider `i` can join now with what joining costs, cheapest first."""
+            result = []
+            for g in domains[i]:
+                if g < floor or size[g] >= capacity[g]:
+                    continue
+                delta = costs[i][g] + increments[g][size[g]]
+                for k in by_group[g]:
+                    if not matches[i][k]:
+                        continue
+                    c = constraints[k]
+                    if c.at_most is not None and count[k] >= c.at_most:
+                        break
+                    if not c.hard and count[k] < c.at_least:
+                        delta -= c.weight
+                else:
+                    result.append((delta, g))
+            result.sort()
+            return result
+
+        def place(i: int, g: int, step: int) -> None:
+            size[g] += step
+            for k in by_group[g]:
+                if matches[i][k]:
+                    count[k] += step
+
+        best_cost = INFEASIBLE
+        best: list[int] | None = None
+        assigned = [-1] * n
+        nodes = 0
+
+        # greedy pass first so the search starts with something to beat
+        cost = start
+        for pos in range(n):
+            i = order[pos]
+            for k in candidate_for[i]:
+                candidates[k] -= 1
+            for delta, g in options(i, 0):
+                place(i, g, 1)
+                if feasible(n - pos - 1):
+                    assigned[pos] = g
+                    cost += delta
+                    break
+                place(i, g, -1)
+            else:
+                break
+        if -1 not in assigned:
+            best_cost, best = cost, list(assigned)
+        for pos in range(n):
+            i = order[pos]
+            for k in candidate_for[i]:
+                candidates[k] += 1
+            if assigned[pos] >= 0:
+                place(i, assigned[pos], -1)
+                assigned[pos] = -1
+
+        def dfs(pos: int, cost: float) -> None:
+            nonlocal best_cost, best, nodes
+            if pos == n:
+                if cost < best_cost:
+                    best_cost, best = cost, list(assigned)
+                return
+            if cost + bound(pos) >= best_cost:
+                return
+            nodes += 1
+            if nodes > self.node_limit:
+                raise _OutOfBudget
+            i = order[pos]
+            floor = assigned[previous_same[pos]] if previous_same[pos] >= 0 else 0
+            choices = options(i, floor)
+            for k in candidate_for[i]:
+                candidates[k] -= 1
+            for delta, g in choices:
+                place(i, g, 1)
+                assigned[pos] = g
+                if feasible(n - pos - 1):
+                    dfs(pos + 1, cost + delta)
+                place(i, g, -1)
+            assigned[pos] = -1
+            for k in candidate_for[i]:
+                candidates[k] += 1
+
+        complete = True
+        if feasible(n):
+            try:
+                dfs(0, start)
+            except _OutOfBudget:
+                complete = False
+                LOGGER.debug(f'grouping search stopped after {nodes} nodes')
+        if best is None:
+            return None, complete
+        solution = [''] * n
+        for pos, g in enumerate(best):
+            solution[order[pos]] = names[g]
+        return solution, complete
+
+    def _diagnose(self, raiders: list[Raider], complete: bool) -> Unsatisfiable:
+        free = sum(self.capacities.values()) - sum(len(members) for members in self._pinned.values())
+        if len(raiders) > free:
+            return Unsatisfiable('capacity', f'{len(raiders)} raiders for {free} open spots')
+        allowed = []
+        for raider in raiders:
+            groups = frozenset(group for group in self.capacities if sum(prefer(raider, group) for prefer in self._preferences) < INFEASIBLE)
+            if not groups:
+                return Unsatisfiable('preferences', f'{raider.name} can not go in any group')
+            allowed.append(groups)
+        # without the count constraints it is a matching, which fits unless some
+        # set of groups has fewer open spots than the raiders who can only go there
+        names = list(self.capacities)
+        for size in range(1, len(names) + 1):
+            for subset in itertools.combinations(names, size):
+                room = sum(self.capacities[group] - len(self._pinned.get(group, [])) for group in subset)
+                stuck = sum(1 for groups in allowed if groups <= set(subset))
+                if stuck > room:
+                    return Unsatisfiable('capacity', f'{stuck} raiders can only go in {", ".join(subset)}, which have {room} open spots')
+        if not complete:
+            return Unsatisfiable('budget', f'no grouping found within {self.node_limit} nodes')
+        hard = [c for c in self.constraints if c.hard]
+        for constraint in hard:
+            solution, _ = self._search(raiders, [constraint])
+            if solution is None:
+                return Unsatisfiable(constraint.name, f'{constraint.name} can not be met')
+        names = ', '.join(c.name for c in hard)
+        return Unsatisfiable(names, f'{names} can not all be met together')
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import bisect
+import logging
+
+from roster import RaidCooldown
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IntervalSet:
+    """Non-overlapping half open intervals [start, end), kept sorted by start."""
+
+    def __init__(self):
+        self._starts: list[float] = []
+        self._ends: list[float] = []
+
+    def overlaps(self, start: float, end: float) -> bool:
+        i = bisect.bisect_right(self._starts, start)
+        if i and self._ends[i - 1] > start:
+            return True
+        return i < len(self._starts) and self._starts[i] < end
+
+    def add(self, start: float, end: float) -> None:
+        i = bisect.bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
+
+
+class CooldownScheduler:
+    """Lays raid cooldowns out over the events of an encounter.
+
+    A cooldown cast at `t` is busy until `t + cooldown`, and casts of a spell
+    that doesn't stack may not be active at the same time. Both are checked
+    as intervals, so casts can be pinned anywhere on the timeline before or
+    between calls to `schedule`.
+    """
+
+    def __init__(self, cooldowns: list[RaidCooldown]):
+        self.cooldowns = cooldowns
+        self._busy = [IntervalSet() for _ in cooldowns]
+        self._active: dict[str, IntervalSet] = {}
+        self._uses = [0] * len(cooldowns)
+
+    def _fits(self, i: int, time: float) -> bool:
+        cooldown = self.cooldowns[i]
+        if self._busy[i].overlaps(time, time + cooldown.cooldown):
+            return False
+        return cooldown.stacks or not self._active.get(cooldown.spell, IntervalSet()).overlaps(time, time + cooldown.duration)
+
+    def _cast(self, i: int, time: float) -> None:
+        cooldown = self.cooldowns[i]
+        self._busy[i].add(time, time + cooldown.cooldown)
+        if not cooldown.stacks:
+            self._active.setdefault(cooldown.spell, IntervalSet()).add(time, time + cooldown.duration)
+        self._uses[i] += 1
+
+    def pin(self, cooldown: RaidCooldown, time: float) -> None:
+        """Record a cast that is already decided, e.g. one kept from the sheet."""
+        i = self.cooldowns.index(cooldown)
+        if not self._fits(i, time):
+            raise ValueError(f'{cooldown.raider.name}\'s {cooldown.spell} is not ready at {time}s')
+        self._cast(i, time)
+
+    def schedule(self, events: list[float], per_event: int = 1) -> list[tuple[RaidCooldown, ...]]:
+        """Pick up to `per_event` cooldowns for each event time, in the order given.
+
+        The least used cooldown that is ready goes first, ties by inventory
+        order, so casts are spread over everyone who has one.
+        """
+        rotation = []
+        for time in events:
+            casts = []
+            for i in sorted(range(len(self.cooldowns)), key=lambda i: self._uses[i]):
+                if len(casts) == per_event:
+                    break
+                if self._fits(i, time):
+                    self._cast(i, time)
+                    casts.append(self.cooldowns[i])
+            if len(casts) < per_event:
+                LOGGER.warning(f'only {len(casts)} of {per_event} raid cooldowns ready at {time}s')
+            rotation.append(tuple(casts))
+        return rotation
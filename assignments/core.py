@@ -1,9 +1,91 @@
 from __future__ import annotations
 
+from collections import Counter
+from typing import Iterable, SupportsIndex
+
 from roster import Raider, Role, WowClass
 
 
 class Assignment(list[Raider]):
+    """A group of raiders, compared to other groups and ints by size.
+
+    Role, class, spec and flex healer counts are kept up to date by every
+    list mutator, so the has_* and *_count checks don't rescan the group.
+    Flex healers count as healers once `flex` is past their flex order.
+    Counts go stale if a member's role or flex order changes while in the
+    group.
+    """
+    __slots__ = ('_roles', '_classes', '_specs', '_flex')
+
+    def __init__(self, raiders: Iterable[Raider | None] = ()):
+        super().__init__()
+        self._roles: Counter[Role] = Counter()
+        self._classes: Counter[str] = Counter()
+        self._specs: Counter[tuple[str, str]] = Counter()
+        self._flex: Counter[int] = Counter()
+        self.extend(raiders)
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    def _count(self, raiders: Iterable[Raider | None], step: int) -> None:
+        for raider in raiders:
+            if raider is None:
+                continue
+            self._roles[raider.role] += step
+            self._classes[raider.wow_class] += step
+            self._specs[raider.wow_class, raider.spec] += step
+            if raider.flex_healer is not None and raider.role != Role.HEALERS:
+                self._flex[raider.flex_healer] += step
+
+    def append(self, raider: Raider | None) -> None:
+        super().append(raider)
+        self._count([raider], 1)
+
+    def extend(self, raiders: Iterable[Raider | None]) -> None:
+        raiders = list(raiders)
+        super().extend(raiders)
+        self._count(raiders, 1)
+
+    def insert(self, index: SupportsIndex, raider: Raider | None) -> None:
+        super().insert(index, raider)
+        self._count([raider], 1)
+
+    def pop(self, index: SupportsIndex = -1) -> Raider | None:
+        raider = super().pop(index)
+        self._count([raider], -1)
+        return raider
+
+    def remove(self, raider: Raider | None) -> None:
+        del self[self.index(raider)]
+
+    def clear(self) -> None:
+        super().clear()
+        for counter in (self._roles, self._classes, self._specs, self._flex):
+            counter.clear()
+
+    def __setitem__(self, index, value) -> None:
+        old = self[index] if isinstance(index, slice) else [self[index]]
+        new = list(value) if isinstance(index, slice) else [value]
+        super().__setitem__(index, new if isinstance(index, slice) else value)
+        self._count(old, -1)
+        self._count(new, 1)
+
+    def __delitem__(self, index) -> None:
+        old = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        self._count(old, -1)
+
+    def __iadd__(self, raiders: Iterable[Raider | None]) -> Assignment:
+        self.extend(raiders)
+        return self
+
+    def __imul__(self, times: int) -> Assignment:
+        raiders = list(self)
+        self.clear()
+        self.extend(raiders * times)
+        return self
+
     def __eq__(self, other: Assignment | int):
         if isinstance(other, int):
             return len(self) == other
@@ -29,43 +111,40 @@ class Assignment(list[Raider]):
             return len(self) <= other
         return len(self) <= len(other)
 
+    def role_count(self, role: Role) -> int:
+        return self._roles[role]
+
+    def class_count(self, wow_class: WowClass | str) -> int:
+        return self._classes[WowClass(wow_class).value]
+
+    def spec_count(self, wow_class: WowClass | str, spec: str) -> int:
+        return self._specs[WowClass(wow_class).value, spec]
+
     def has_healer(self, flex=0) -> bool:
-        for raider in self:
-            if raider.role == Role.HEALERS:
-                return True
-            elif raider.flex_healer is not None and raider.flex_healer < flex:
-                return True
-        return False
+        return self.healer_count(flex) > 0
 
     def healer_count(self, flex=0) -> int:
-        return len([x for x in self if x is not None and (x.role == Role.HEALERS or x.flex_healer is not None and x.flex_healer < flex)])
+        count = self._roles[Role.HEALERS]
+        if flex and self._flex:
+            count += sum(n for order, n in self._flex.items() if order < flex)
+        return count
 
     def has_death_knight(self) -> bool:
-        for raider in self:
-            if raider.wow_class == WowClass.DEATH_KNIGHT.value:
-                return True
-        return False
+        return self._classes[WowClass.DEATH_KNIGHT.value] > 0
 
     def has_druid(self, spec: str) -> bool:
-        for raider in self:
-            if raider.wow_class == WowClass.DRUID.value:
-                if not spec:
-                    return True
-                elif raider.spec == spec:
-                    return True
-        return False
+        if not spec:
+            return self._classes[WowClass.DRUID.value] > 0
+        return self._specs[WowClass.DRUID.value, spec] > 0
 
     def has_warrior(self) -> bool:
-        for raider in self:
-            if raider.wow_class == WowClass.WARRIOR.value:
-                return True
-        return False
+        return self._classes[WowClass.WARRIOR.value] > 0
 
     def has_paladin(self, spec: str) -> bool:
-        for raider in self:
-            if raider.wow_class == WowClass.PALADIN.value:
-                if not spec:
-                    return True
-                elif raider.spec == spec:
-                    return True
-        return False
+        if not spec:
+            return self._classes[WowClass.PALADIN.value] > 0
+        return self._specs[WowClass.PALADIN.value, spec] > 0
+
+
+class RaidOverfull(Exception):
+    pass
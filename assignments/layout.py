@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, ClassVar
+
+from pydantic import BaseModel
+
+from assignments.cache import SolutionCache
+from assignments.core import Assignment
+from google_sheets import SHEET_ID, WriteBuffer, batch_get, format_range, parse_range
+from roster import RaidRoster, Raider
+
+LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Slot:
+    """One raider in one cell. Rows and columns are relative to the layout anchor.
+
+    `icon` is the column of the spec icon next to the name, if the slot has one.
+    """
+    name: str
+    row: int
+    column: int
+    icon: int | None = None
+
+
+@dataclass(frozen=True)
+class Group:
+    """Up to `size` raiders listed down a column, starting at `row`."""
+    name: str
+    row: int
+    column: int
+    size: int
+
+
+@dataclass(frozen=True)
+class Layout:
+    """Where a boss's assignments live on the sheet.
+
+    `anchor` is the A1 range holding every slot and group. Empty slots are
+    written as `empty` (and `empty_icon`), unused group rows are cleared.
+    """
+    anchor: str
+    slots: tuple[Slot, ...] = ()
+    groups: tuple[Group, ...] = ()
+    empty: str = 'Empty'
+    empty_icon: str | None = None
+
+
+@dataclass(frozen=True)
+class SlotTable:
+    """A compiled layout: slots and groups by name, the A1 range of each and the anchor's rows and columns."""
+    layout: Layout
+    slots: dict[str, Slot]
+    groups: dict[str, Group]
+    a1: dict[str, str]
+    shape: tuple[int, int]
+
+    @property
+    def range(self) -> str:
+        return self.layout.anchor
+
+    def blank(self) -> list[list[str]]:
+        rows, columns = self.shape
+        return [[''] * columns for _ in range(rows)]
+
+    def read_slots(self, grid: list[list[Any]], roster: RaidRoster) -> dict[str, Raider | None]:
+        return {name: roster.get_raider_by_name(grid[slot.row][slot.column]) for name, slot in self.slots.items()}
+
+    def read_groups(self, grid: list[list[Any]], roster: RaidRoster) -> dict[str, list[Raider]]:
+        groups = {}
+        for name, group in self.groups.items():
+            raiders = (roster.get_raider_by_name(grid[group.row + i][group.column]) for i in range(group.size))
+            groups[name] = [raider for raider in raiders if raider is not None]
+        return groups
+
+    def write_slots(self, grid: list[list[Any]], raiders: dict[str, Raider | None]) -> None:
+        for name, slot in self.slots.items():
+            raider = raiders.get(name)
+            grid[slot.row][slot.column] = raider.name if raider else self.layout.empty
+            if slot.icon is not None:
+                icon = raider.spec_link if raider else self.layout.empty_icon
+                grid[slot.row][slot.icon] = f'=image("{icon}")' if icon else ''
+
+    def write_groups(self, grid: list[list[Any]], groups: dict[str, list[Raider]]) -> None:
+        for name, group in self.groups.items():
+            raiders = groups.get(name, [])
+            for raider in raiders[group.size:]:
+                LOGGER.warning(f'{raider.name} does not have a spot in {name} ({self.a1[name]})')
+            for i in range(group.size):
+                raider = raiders[i] if i < len(raiders) else None
+                grid[group.row + i][group.column] = raider.name if raider else ''
+
+
+@lru_cache
+def compile_layout(layout: Layout) -> SlotTable:
+    """Index a layout by slot and group name, checking every cell is inside the anchor and used once."""
+    sheet, start_row, start_column, end_row, end_column = parse_range(layout.anchor)
+    used: dict[tuple[int, int], str] = {}
+
+    def claim(name: str, row: int, column: int) -> None:
+        if not (0 <= row < end_row - start_row and 0 <= column < end_column - start_column):
+            raise ValueError(f'{name} is outside {layout.anchor}')
+        if (row, column) in used:
+            raise ValueError(f'{name} and {used[row, column]} share a cell')
+        used[row, column] = name
+
+    slots, groups, a1 = {}, {}, {}
+    for slot in layout.slots:
+        claim(slot.name, slot.row, slot.column)
+        if slot.icon is not None:
+            claim(slot.name, slot.row, slot.icon)
+        slots[slot.name] = slot
+        a1[slot.name] = format_range(sheet, start_row + slot.row, start_column + slot.column, start_row + slot.row + 1, start_column + slot.column + 1)
+    for group in layout.groups:
+        for i in range(group.size):
+            claim(group.name, group.row + i, group.column)
+        groups[group.name] = group
+        a1[group.name] = format_range(sheet, start_row + group.row, start_column + group.column, start_row + group.row + group.size, start_column + group.column + 1)
+    return SlotTable(layout, slots, groups, a1, (end_row - start_row, end_column - start_column))
+
+
+class LayoutBoss(BaseModel):
+    """A boss whose sheet geometry is a Layout.
+
+    Slots and groups are read into and written from the fields of the same
+    name, Raider | None for slots and an Assignment for groups. Slots without
+    a field are only written, with the raiders from `slot_values`.
+
+    `VERSION` is part of the solution cache key; bump it when `optimize`
+    changes what it produces.
+    """
+    LAYOUT: ClassVar[Layout]
+    RANGES: ClassVar[list[str]] = []
+    VERSION: ClassVar[int] = 1
+
+    roster: RaidRoster
+    _cells: list[list[str]] | None = None
+    _original: list[list[str]] | None = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        if hasattr(cls, 'LAYOUT'):
+            cls.RANGES = [cls.LAYOUT.anchor]
+
+    @classmethod
+    def table(cls) -> SlotTable:
+        return compile_layout(cls.LAYOUT)
+
+    def get_assignments(self, snapshot: dict[str, list[list[str]]]):
+        table = self.table()
+        # start from empty, so reading cells over a solved boss (a cache hit) replaces it
+        for name in table.slots:
+            if name in self.model_fields:
+                setattr(self, name, None)
+        for name in table.groups:
+            setattr(self, name, Assignment())
+        self.roster.reset_positions()
+        self._original = snapshot[table.range]
+        self._cells = [row[:] for row in self._original]
+        for name, raider in table.read_slots(self._cells, self.roster).items():
+            if name in self.model_fields:
+                setattr(self, name, raider)
+                if raider is not None:
+                    self.roster.set_position(raider)
+        for name, raiders in table.read_groups(self._cells, self.roster).items():
+            for raider in raiders:
+                getattr(self, name).append(raider)
+                self.roster.set_position(raider)
+
+    def release(self, names: set[str]) -> bool:
+        """Take the named raiders out of the slots and groups read from the sheet, returning whether any were."""
+        released = False
+        table = self.table()
+        for name in table.slots:
+            raider = getattr(self, name) if name in self.model_fields else None
+            if raider is not None and raider.name in names:
+                setattr(self, name, None)
+                self.roster.set_position(raider, False)
+                released = True
+        for name in table.groups:
+            group = getattr(self, name)
+            for raider in [raider for raider in group if raider.name in names]:
+                group.remove(raider)
+                self.roster.set_position(raider, False)
+                released = True
+        return released
+
+    def cells(self) -> dict[str, list[list[str]]]:
+        """The boss's range as last read or written."""
+        return {self.table().range: self._cells}
+
+    def fingerprint(self) -> str:
+        """A hash of everything `optimize` works from.
+
+        The roster (ignoring where signups sit in the raid plan, with flex and
+        main tank settings), the boss's plain options, the cells read from the
+        sheet, the layout and VERSION.
+        """
+        raiders = sorted([raider.to_row()[2:], raider.flex_healer, raider.flex_spec, raider.main_tank] for raider in self.roster)
+        options = {name: value for name, value in self if isinstance(value, (bool, int, float, str))}
+        data = [type(self).__name__, self.VERSION, repr(self.LAYOUT), raiders, options, self._original]
+        return hashlib.sha256(json.dumps(data, default=str).encode()).hexdigest()
+
+    def solve(self, snapshot: dict[str, list[list[str]]] | None, cache: SolutionCache | None = None) -> None:
+        """Read the boss from `snapshot` and optimize it, or replay the cached solution for the same inputs.
+
+        Without a snapshot the boss is solved from empty.
+        """
+        if snapshot is not None:
+            self.get_assignments(snapshot)
+        if cache is None:
+            self.optimize()
+            return
+        key = self.fingerprint()
+        cells = cache.get(key)
+        if cells is None:
+            self.optimize()
+            if self._cells is None:
+                self._cells = self.table().blank()
+            cache.put(key, self.render())
+            return
+        original = self._original
+        self.get_assignments({self.table().range: cells})
+        self._original = original
+
+    def slot_values(self) -> dict[str, Raider | None]:
+        return {name: getattr(self, name) for name in self.table().slots if name in self.model_fields}
+
+    def render(self) -> list[list[str]]:
+        """Write the assignments into the boss's cells and return them."""
+        table = self.table()
+        table.write_slots(self._cells, self.slot_values())
+        table.write_groups(self._cells, {name: getattr(self, name) for name in table.groups})
+        return self._cells
+
+    def write(self, buffer: WriteBuffer, sheet_id: str = SHEET_ID):
+        table = self.table()
+        if self._cells is None or self._original is None:
+            self._original = batch_get(sheet_id, [table.range])[table.range]
+            self._cells = [row[:] for row in self._original]
+        self.render()
+        buffer.add_changes(sheet_id, table.range, self._original, self._cells)
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+INFEASIBLE = 1e9
+
+
+def min_cost_assignment(costs: list[list[float]]) -> list[int]:
+    """Match every row to a distinct column so the total cost is as small as possible.
+
+    `costs` is a rows x columns matrix with no more rows than columns. Returns
+    the column picked for each row. Uses the Hungarian method with
+    potentials, O(rows^2 * columns). Pairs that must not be matched should
+    cost INFEASIBLE; if the best matching still uses one, there is no
+    feasible matching and ValueError is raised.
+    """
+    n = len(costs)
+    m = len(costs[0]) if n else 0
+    if n > m:
+        raise ValueError(f'cannot match {n} rows to {m} columns')
+    inf = float('inf')
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    match = [0] * (m + 1)  # row matched to each column, 1 based, 0 is free
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        match[0] = i
+        j0 = 0
+        min_v = [inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = match[j0]
+            row = costs[i0 - 1]
+            delta = inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    cur = row[j - 1] - u[i0] - v[j]
+                    if cur < min_v[j]:
+                        min_v[j] = cur
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+    result = [-1] * n
+    for j in range(1, m + 1):
+        if match[j]:
+            result[match[j] - 1] = j - 1
+    if any(costs[i][j] >= INFEASIBLE for i, j in enumerate(result)):
+        raise ValueError('no feasible matching')
+    return result
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from assignments.cache import SolutionCache
+from google_sheets import WriteBuffer, batch_get
+from roster import RaidRoster
+from run_config import RunConfig
+from run_state import RUN_STATE_FILE, RosterDiff, RunState
+
+LOGGER = logging.getLogger(__name__)
+
+MAX_WORKERS = 4
+
+
+def run_tier(
+    raid_id: int,
+    sheet_id: str,
+    bosses: list[type],
+    gids: list[str] | None = None,
+    config: RunConfig | None = None,
+    max_workers: int = MAX_WORKERS,
+    state_file: str | None = RUN_STATE_FILE,
+    cache: SolutionCache | None = None,
+) -> None:
+    """Fetch the roster, then read, optimize and write every boss of a tier.
+
+    The raid-helper fetch and the sheet prefetch run at the same time, and
+    the bosses run side by side on at most `max_workers` threads. Writes are
+    collected in one buffer and committed once every boss has finished.
+    Each boss gets its options from `config` and checks `cache` before
+    optimizing. What was written is saved to `state_file` for `update_tier`.
+    """
+    config = config or RunConfig()
+    ranges = [cell_range for Boss in bosses for cell_range in Boss.RANGES]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        roster_future = executor.submit(RaidRoster.from_raid_plan, raid_id, config)
+        snapshot_future = executor.submit(batch_get, sheet_id, ranges)
+        roster = roster_future.result()
+        format_future = executor.submit(roster.conditional_format, sheet_id, gids) if gids else None
+        snapshot = snapshot_future.result()
+        instances = [Boss(roster=roster.overlay(), **config.boss_options(Boss)) for Boss in bosses]
+        with WriteBuffer() as buffer:
+            futures = [executor.submit(run_boss, boss, snapshot, buffer, sheet_id, cache) for boss in instances]
+            for future in futures:
+                future.result()
+        if format_future is not None:
+            format_future.result()
+    if state_file:
+        save_state(state_file, raid_id, sheet_id, config, roster, snapshot, instances)
+
+
+def update_tier(
+    raid_id: int,
+    sheet_id: str,
+    bosses: list[type],
+    gids: list[str] | None = None,
+    config: RunConfig | None = None,
+    max_workers: int = MAX_WORKERS,
+    state_file: str = RUN_STATE_FILE,
+) -> None:
+    """Repair a tier after signup changes instead of redoing it.
+
+    The new raid plan is diffed against the roster saved by the last run.
+    Raiders who dropped or changed spec are taken off the sheet, everyone
+    else stays pinned where the last run put them, and only bosses whose
+    block held a released raider, or every boss when someone signed up, are
+    optimized and written. Name colours are resynced when someone signed up
+    or changed colour. The sheet is not read: the saved cells stand in
+    for it, so edits made by hand since the last run are not seen. Without
+    a state for this raid, sheet and config it falls back to `run_tier`.
+    """
+    config = config or RunConfig()
+    state = RunState.load(state_file)
+    ranges = [cell_range for Boss in bosses for cell_range in Boss.RANGES]
+    if state is None or (state.raid_id, state.sheet_id, state.config) != (raid_id, sheet_id, config) or not state.cells.keys() >= set(ranges):
+        LOGGER.info('no saved state for this run, running the whole tier')
+        return run_tier(raid_id, sheet_id, bosses, gids, config, max_workers, state_file)
+
+    roster = RaidRoster.from_raid_plan(raid_id, config)
+    diff = state.diff(roster)
+    if not diff:
+        LOGGER.info('no signup changes since the last run')
+        return
+    instances = [Boss(roster=roster.overlay(), **config.boss_options(Boss)) for Boss in bosses if is_affected(Boss, state.cells, diff)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        format_future = executor.submit(roster.conditional_format, sheet_id, gids) if gids and (diff.added or diff.recolored) else None
+        with WriteBuffer() as buffer:
+            futures = [executor.submit(update_boss, boss, state.cells, diff, buffer, sheet_id) for boss in instances]
+            for future in futures:
+                future.result()
+        if format_future is not None:
+            format_future.result()
+    save_state(state_file, raid_id, sheet_id, config, roster, state.cells, instances)
+
+
+def is_affected(Boss: type, cells: dict[str, list[list[str]]], diff: RosterDiff) -> bool:
+    if diff.added:
+        return True
+    released = diff.released
+    return any(cell in released for cell_range in Boss.RANGES for row in cells[cell_range] for cell in row)
+
+
+def save_state(state_file: str, raid_id: int, sheet_id: str, config: RunConfig, roster: RaidRoster, snapshot: dict[str, list[list[str]]], bosses: list) -> None:
+    """Save the roster and every range as written, taking ranges of bosses that didn't run from `snapshot`."""
+    cells = dict(snapshot)
+    for boss in bosses:
+        if hasattr(boss, 'cells'):
+            cells.update(boss.cells())
+    RunState(raid_id=raid_id, sheet_id=sheet_id, config=config, roster=roster.to_rows(), cells=cells).save(state_file)
+
+
+def run_boss(boss, snapshot: dict[str, list[list[str]]], buffer: WriteBuffer, sheet_id: str, cache: SolutionCache | None = None) -> None:
+    boss.solve(snapshot, cache)
+    boss.write(buffer, sheet_id)
+
+
+def update_boss(boss, snapshot: dict[str, list[list[str]]], diff: RosterDiff, buffer: WriteBuffer, sheet_id: str) -> None:
+    boss.get_assignments(snapshot)
+    boss.release(diff.released)
+    boss.optimize()
+    boss.write(buffer, sheet_id)
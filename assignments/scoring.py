@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import math
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+from roster import Raider
+
+INFEASIBLE = float('inf')
+STEPS = 20_000
+
+
+@dataclass
+class CountTerm:
+    """Cost of a group holding k raiders that match `predicate`: `costs[k]`, the last value repeating.
+
+    Applies to every group unless `groups` names some. A cost of INFEASIBLE
+    makes a count off limits, which is how hard limits are written.
+    """
+    name: str
+    predicate: Callable[[Raider], bool]
+    costs: list[float]
+    groups: tuple[str, ...] | None = None
+
+    def cost(self, count: int) -> float:
+        return self.costs[min(count, len(self.costs) - 1)]
+
+
+class ScoreModel:
+    """How good a split of raiders into groups is, lower is better.
+
+    The score is the sum of `preference(raider, group)` over the raiders that
+    can move, plus every count term over every group it applies to. Pinned
+    raiders count toward the terms but never move.
+    """
+
+    def __init__(
+        self,
+        capacities: dict[str, int],
+        preference: Callable[[Raider, str], float] | None = None,
+        terms: list[CountTerm] | None = None,
+        pinned: dict[str, list[Raider]] | None = None,
+    ):
+        self.capacities = capacities
+        self.preference = preference or (lambda raider, group: 0)
+        self.terms = terms or []
+        self.pinned = pinned or {}
+
+    def score(self, grouping: dict[str, list[Raider]]) -> float:
+        """Score `grouping`, the raiders placed in each group besides the pinned ones."""
+        total = sum(self.preference(raider, group) for group, raiders in grouping.items() for raider in raiders)
+        for group in self.capacities:
+            members = self.pinned.get(group, []) + grouping.get(group, [])
+            for term in self.terms:
+                if term.groups is None or group in term.groups:
+                    total += term.cost(sum(1 for raider in members if term.predicate(raider)))
+        return total
+
+
+class LocalSearch:
+    """Simulated annealing over moves and swaps of the raiders in a grouping.
+
+    Each raider's preference per group and each term's count per group are
+    kept up to date, so a move or swap is scored from the terms the raiders
+    involved match instead of rescoring the raid. The budget is a number of
+    steps and the moves come from a seeded generator, so the same grouping
+    and seed always anneal to the same result.
+    """
+
+    def __init__(self, model: ScoreModel, grouping: dict[str, list[Raider]], seed: int | None = 0):
+        self.model = model
+        self.names = list(model.capacities)
+        self.random = random.Random(seed)
+        index = {name: g for g, name in enumerate(self.names)}
+        self.raiders = [raider for name in self.names for raider in grouping.get(name, [])]
+        self.group = [index[name] for name in self.names for _ in grouping.get(name, [])]
+        self.capacity = [model.capacities[name] for name in self.names]
+        self.size = [len(model.pinned.get(name, [])) + len(grouping.get(name, [])) for name in self.names]
+
+        terms = model.terms
+        self.preference = [[model.preference(raider, name) for name in self.names] for raider in self.raiders]
+        self.matches = [[t for t, term in enumerate(terms) if term.predicate(raider)] for raider in self.raiders]
+        most = sum(self.size)
+        self.tables = [
+            [[term.cost(k) for k in range(most + 2)] if term.groups is None or name in term.groups else None for name in self.names]
+            for term in terms
+        ]
+        self.counts = [[0] * len(self.names) for _ in terms]
+        for name, members in model.pinned.items():
+            for raider in members:
+                for t, term in enumerate(terms):
+                    if term.predicate(raider):
+                        self.counts[t][index[name]] += 1
+        for i, g in enumerate(self.group):
+            for t in self.matches[i]:
+                self.counts[t][g] += 1
+        self.score = model.score(grouping)
+
+    def _term_delta(self, t: int, g: int, change: int) -> float:
+        table = self.tables[t][g]
+        if table is None or not change:
+            return 0
+        count = self.counts[t][g]
+        return table[count + change] - table[count]
+
+    def move_delta(self, i: int, g: int) -> float:
+        old = self.group[i]
+        if g == old:
+            return 0
+        delta = self.preference[i][g] - self.preference[i][old]
+        for t in self.matches[i]:
+            delta += self._term_delta(t, old, -1) + self._term_delta(t, g, 1)
+        return delta
+
+    def swap_delta(self, i: int, j: int) -> float:
+        gi, gj = self.group[i], self.group[j]
+        if gi == gj:
+            return 0
+        delta = self.preference[i][gj] + self.preference[j][gi] - self.preference[i][gi] - self.preference[j][gj]
+        for t in set(self.matches[i]).symmetric_difference(self.matches[j]):
+            change = (t in self.matches[j]) - (t in self.matches[i])
+            delta += self._term_delta(t, gi, change) + self._term_delta(t, gj, -change)
+        return delta
+
+    def move(self, i: int, g: int, delta: float) -> None:
+        old = self.group[i]
+        for t in self.matches[i]:
+            self.counts[t][old] -= 1
+            self.counts[t][g] += 1
+        self.size[old] -= 1
+        self.size[g] += 1
+        self.group[i] = g
+        self.score += delta
+
+    def swap(self, i: int, j: int, delta: float) -> None:
+        gi, gj = self.group[i], self.group[j]
+        for t in self.matches[i]:
+            self.counts[t][gi] -= 1
+            self.counts[t][gj] += 1
+        for t in self.matches[j]:
+            self.counts[t][gj] -= 1
+            self.counts[t][gi] += 1
+        self.group[i], self.group[j] = gj, gi
+        self.score += delta
+
+    def grouping(self) -> dict[str, list[Raider]]:
+        grouping = {name: [] for name in self.names}
+        for raider, g in zip(self.raiders, self.group):
+            grouping[self.names[g]].append(raider)
+        return grouping
+
+    def _random_step(self) -> tuple[float, Callable[[], None]] | None:
+        """A random move or swap as (delta, apply), or None if it isn't allowed."""
+        n, groups = len(self.raiders), len(self.names)
+        i = self.random.randrange(n)
+        if self.random.random() < 0.5:
+            g = self.random.randrange(groups - 1)
+            g += g >= self.group[i]
+            if self.size[g] >= self.capacity[g]:
+                return None
+            delta = self.move_delta(i, g)
+            step = lambda: self.move(i, g, delta)
+        else:
+            j = self.random.randrange(n)
+            if self.group[i] == self.group[j]:
+                return None
+            delta = self.swap_delta(i, j)
+            step = lambda: self.swap(i, j, delta)
+        if math.isnan(delta) or delta == INFEASIBLE:
+            return None
+        return delta, step
+
+    def run(self, steps: int = STEPS) -> dict[str, list[Raider]]:
+        """Anneal for `steps` steps and return the best grouping seen."""
+        if not self.raiders or len(self.names) < 2:
+            return self.grouping()
+        # start hot enough that a typical uphill step is taken half the time
+        uphill = [step[0] for step in (self._random_step() for _ in range(100)) if step is not None and step[0] > 0]
+        hot = (sum(uphill) / len(uphill) if uphill else 1.0) / math.log(2)
+        cold = hot / 1000
+        temperature = hot
+        best_score, best = self.score, list(self.group)
+        for iteration in range(steps):
+            if iteration & 127 == 0:
+                temperature = hot * (cold / hot) ** (iteration / steps)
+            step = self._random_step()
+            if step is None:
+                continue
+            delta, apply = step
+            if delta <= 0 or self.random.random() < math.exp(-delta / temperature):
+                apply()
+                if self.score < best_score - 1e-9:
+                    best_score, best = self.score, list(self.group)
+        grouping = {name: [] for name in self.names}
+        for raider, g in zip(self.raiders, best):
+            grouping[self.names[g]].append(raider)
+        return grouping
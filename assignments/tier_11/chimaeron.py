@@ -1,11 +1,36 @@
-from pydantic import BaseModel
+from assignments.core import RaidOverfull
+from assignments.layout import Layout, LayoutBoss, Slot
+from assignments.matching import min_cost_assignment
+from roster import Raider, Role, WowClass
 
-from google_sheets import SHEET_ID, get_range, write_range
-from roster import RaidRoster, Raider
+NUMBERS = [
+    'one', 'two', 'three', 'four', 'five', 'six', 'seven', 'eight',
+    'nine', 'ten', 'eleven', 'twelve', 'thirteen', 'fourteen', 'fifteen',
+]
+LAYOUT = Layout(
+    anchor='BWD Assigns!AV97:BG111',
+    slots=(
+        *(Slot(f'ranged_{number}', i, 0) for i, number in enumerate(NUMBERS)),
+        *(Slot(f'melee_{number}', i, 11) for i, number in enumerate(NUMBERS[:10])),
+    ),
+)
+# best spot first
+MELEE_SPOTS = [
+    'melee_five', 'melee_six', 'melee_seven', 'melee_three', 'melee_eight',
+    'melee_four', 'melee_nine', 'melee_two', 'melee_ten', 'melee_one',
+]
+RANGED_SPOTS = [
+    'ranged_four', 'ranged_five', 'ranged_three', 'ranged_six', 'ranged_two',
+    'ranged_seven', 'ranged_twelve', 'ranged_eleven', 'ranged_thirteen', 'ranged_ten',
+    'ranged_fourteen', 'ranged_nine', 'ranged_fifteen', 'ranged_one', 'ranged_eight',
+]
+WARLOCK_SPOTS = ['melee_one', 'melee_ten', 'melee_nine', 'melee_two']
+OFF_SIDE = 100
 
 
-class Chimaeron(BaseModel):
-    roster: RaidRoster
+class Chimaeron(LayoutBoss):
+    LAYOUT = LAYOUT
+
     melee_one: Raider | None = None
     melee_two: Raider | None = None
     melee_three: Raider | None = None
@@ -31,212 +56,54 @@ class Chimaeron(BaseModel):
     ranged_thirteen: Raider | None = None
     ranged_fourteen: Raider | None = None
     ranged_fifteen: Raider | None = None
-
-    _cells: list[list[str]] | None = None
     flex_healers: int = 0
 
-    def get_melee_spot(self):
-        if not self.melee_five:
-            return 'melee_five'
-        elif not self.melee_six:
-            return 'melee_six'
-        elif not self.melee_seven:
-            return 'melee_seven'
-        elif not self.melee_three:
-            return 'melee_three'
-        elif not self.melee_eight:
-            return 'melee_eight'
-        elif not self.melee_four:
-            return 'melee_four'
-        elif not self.melee_nine:
-            return 'melee_nine'
-        elif not self.melee_two:
-            return 'melee_two'
-        elif not self.melee_ten:
-            return 'melee_ten'
-        elif not self.melee_one:
-            return 'melee_one'
-        else:
-            return self.get_ranged_spot()
+    def open_spots(self) -> list[str]:
+        return [spot for spot in MELEE_SPOTS + RANGED_SPOTS if getattr(self, spot) is None]
 
-    def get_ranged_spot(self):
-        if not self.ranged_four:
-            return 'ranged_four'
-        elif not self.ranged_five:
-            return 'ranged_five'
-        elif not self.ranged_three:
-            return 'ranged_three'
-        elif not self.ranged_six:
-            return 'ranged_six'
-        elif not self.ranged_two:
-            return 'ranged_two'
-        elif not self.ranged_seven:
-            return 'ranged_seven'
-        elif not self.ranged_twelve:
-            return 'ranged_twelve'
-        elif not self.ranged_eleven:
-            return 'ranged_eleven'
-        elif not self.ranged_thirteen:
-            return 'ranged_thirteen'
-        elif not self.ranged_ten:
-            return 'ranged_ten'
-        elif not self.ranged_fourteen:
-            return 'ranged_fourteen'
-        elif not self.ranged_nine:
-            return 'ranged_nine'
-        elif not self.ranged_fifteen:
-            return 'ranged_fifteen'
-        elif not self.ranged_one:
-            return 'ranged_one'
-        elif not self.ranged_eight:
-            return 'ranged_eight'
+    def is_healer(self, raider: Raider) -> bool:
+        return raider.role == Role.HEALERS or raider.flex_healer is not None and raider.flex_healer < self.flex_healers
+
+    def spot_cost(self, raider: Raider, spot: str) -> int:
+        """Cost of standing `raider` in `spot`, lower is better.
+
+        Spots are ranked best first on each side of the room and the rank is
+        weighted by who should get first pick: rogues and healers, then the
+        other melee and ranged, then off tanks. Warlocks prefer the four melee
+        spots the others fill last, and anyone on the wrong side costs
+        OFF_SIDE.
+        """
+        melee_spot = spot.startswith('melee')
+        rank = MELEE_SPOTS.index(spot) if melee_spot else RANGED_SPOTS.index(spot)
+        if raider.wow_class == WowClass.WARLOCK.value:
+            if spot in WARLOCK_SPOTS:
+                return WARLOCK_SPOTS.index(spot)
+            return rank + (OFF_SIDE if melee_spot else len(WARLOCK_SPOTS))
+        if raider.wow_class == WowClass.ROGUE.value or self.is_healer(raider):
+            weight = 3
+        elif raider.role == Role.TANKS:
+            weight = 1
         else:
-            return self.get_melee_spot()
+            weight = 2
+        cost = rank * weight
+        if melee_spot != (raider.role in [Role.MELEE, Role.TANKS]):
+            cost += OFF_SIDE
+        return cost
 
     def set_position(self, spot, raider):
         setattr(self, spot, raider)
-        raider.position_set = True
+        self.roster.set_position(raider)
 
     def optimize(self):
         main_tank = self.roster.get_tank(main_tank=True)
-        main_tank.position_set = True
-        for raider in self.roster.get_rogues():
-            if not raider.position_set:
-                self.set_position(self.get_melee_spot(), raider)
-
-        for raider in self.roster.get_healers():
-            if not raider.position_set:
-                self.set_position(self.get_ranged_spot(), raider)
-
-        for raider in self.roster.get_melee():
-            if not raider.position_set:
-                self.set_position(self.get_melee_spot(), raider)
-
-        for raider in self.roster.get_tanks():
-            if not raider.position_set:
-                self.set_position(self.get_melee_spot(), raider)
-
-        for raider in self.roster.get_warlocks():
-            if not raider.position_set:
-                if not self.melee_one:
-                    self.set_position('melee_one', raider)
-                elif not self.melee_ten:
-                    self.set_position('melee_ten', raider)
-                elif not self.melee_nine:
-                    self.set_position('melee_nine', raider)
-                elif not self.melee_two:
-                    self.set_position('melee_two', raider)
-
-        for raider in self.roster.get_ranged():
-            if not raider.position_set:
-                self.set_position(self.get_ranged_spot(), raider)
-
-    def get_assignments(self):
-        for raider in self.roster:
-            raider.position_set = False
-        self._cells = get_range(SHEET_ID, 'BWD Assigns!AV97:BG111')
-        self.ranged_one = self.roster.get_raider_by_name(self._cells[0][0])
-        if self.ranged_one is not None:
-            self.ranged_one.position_set = True
-        self.melee_one = self.roster.get_raider_by_name(self._cells[0][-1])
-        if self.melee_one is not None:
-            self.melee_one.position_set = True
-        self.ranged_two = self.roster.get_raider_by_name(self._cells[1][0])
-        if self.ranged_two is not None:
-            self.ranged_two.position_set = True
-        self.melee_two = self.roster.get_raider_by_name(self._cells[1][-1])
-        if self.melee_two is not None:
-            self.melee_two.position_set = True
-        self.ranged_three = self.roster.get_raider_by_name(self._cells[2][0])
-        if self.ranged_three is not None:
-            self.ranged_three.position_set = True
-        self.melee_three = self.roster.get_raider_by_name(self._cells[2][-1])
-        if self.melee_three is not None:
-            self.melee_three.position_set = True
-        self.ranged_four = self.roster.get_raider_by_name(self._cells[3][0])
-        if self.ranged_four is not None:
-            self.ranged_four.position_set = True
-        self.melee_four = self.roster.get_raider_by_name(self._cells[3][-1])
-        if self.melee_four is not None:
-            self.melee_four.position_set = True
-        self.ranged_five = self.roster.get_raider_by_name(self._cells[4][0])
-        if self.ranged_five is not None:
-            self.ranged_five.position_set = True
-        self.melee_five = self.roster.get_raider_by_name(self._cells[4][-1])
-        if self.melee_five is not None:
-            self.melee_five.position_set = True
-        self.ranged_six = self.roster.get_raider_by_name(self._cells[5][0])
-        if self.ranged_six is not None:
-            self.ranged_six.position_set = True
-        self.melee_six = self.roster.get_raider_by_name(self._cells[5][-1])
-        if self.melee_six is not None:
-            self.melee_six.position_set = True
-        self.ranged_seven = self.roster.get_raider_by_name(self._cells[6][0])
-        if self.ranged_seven is not None:
-            self.ranged_seven.position_set = True
-        self.melee_seven = self.roster.get_raider_by_name(self._cells[6][-1])
-        if self.melee_seven is not None:
-            self.melee_seven.position_set = True
-        self.ranged_eight = self.roster.get_raider_by_name(self._cells[7][0])
-        if self.ranged_eight is not None:
-            self.ranged_eight.position_set = True
-        self.melee_eight = self.roster.get_raider_by_name(self._cells[7][-1])
-        if self.melee_eight is not None:
-            self.melee_eight.position_set = True
-        self.ranged_nine = self.roster.get_raider_by_name(self._cells[8][0])
-        if self.ranged_nine is not None:
-            self.ranged_nine.position_set = True
-        self.melee_nine = self.roster.get_raider_by_name(self._cells[8][-1])
-        if self.melee_nine is not None:
-            self.melee_nine.position_set = True
-        self.ranged_ten = self.roster.get_raider_by_name(self._cells[9][0])
-        if self.ranged_ten is not None:
-            self.ranged_ten.position_set = True
-        self.melee_ten = self.roster.get_raider_by_name(self._cells[9][-1])
-        if self.melee_ten is not None:
-            self.melee_ten.position_set = True
-        self.ranged_eleven = self.roster.get_raider_by_name(self._cells[10][0])
-        if self.ranged_eleven is not None:
-            self.ranged_eleven.position_set = True
-        self.ranged_twelve = self.roster.get_raider_by_name(self._cells[11][0])
-        if self.ranged_twelve is not None:
-            self.ranged_twelve.position_set = True
-        self.ranged_thirteen = self.roster.get_raider_by_name(self._cells[12][0])
-        if self.ranged_thirteen is not None:
-            self.ranged_thirteen.position_set = True
-        self.ranged_fourteen = self.roster.get_raider_by_name(self._cells[13][0])
-        if self.ranged_fourteen is not None:
-            self.ranged_fourteen.position_set = True
-        self.ranged_fifteen = self.roster.get_raider_by_name(self._cells[14][0])
-        if self.ranged_fifteen is not None:
-            self.ranged_fifteen.position_set = True
+        self.roster.set_position(main_tank)
+        raiders = [raider for raider in self.roster if not self.roster.is_set(raider)]
+        spots = self.open_spots()
+        if len(raiders) > len(spots):
+            raise RaidOverfull(f'{len(raiders)} raiders for {len(spots)} open Chimaeron spots')
+        costs = [[self.spot_cost(raider, spot) for spot in spots] for raider in raiders]
+        for raider, j in zip(raiders, min_cost_assignment(costs)):
+            self.set_position(spots[j], raider)
 
-    def write(self):
-        if not self._cells:
-            self._cells = get_range(SHEET_ID, 'BWD Assigns!AV97:BG111')
-        self._cells[0][0] = self.ranged_one.name if self.ranged_one else 'Empty'
-        self._cells[0][-1] = self.melee_one.name if self.melee_one else 'Empty'
-        self._cells[1][0] = self.ranged_two.name if self.ranged_two else 'Empty'
-        self._cells[1][-1] = self.melee_two.name if self.melee_two else 'Empty'
-        self._cells[2][0] = self.ranged_three.name if self.ranged_three else 'Empty'
-        self._cells[2][-1] = self.melee_three.name if self.melee_three else 'Empty'
-        self._cells[3][0] = self.ranged_four.name if self.ranged_four else 'Empty'
-        self._cells[3][-1] = self.melee_four.name if self.melee_four else 'Empty'
-        self._cells[4][0] = self.ranged_five.name if self.ranged_five else 'Empty'
-        self._cells[4][-1] = self.melee_five.name if self.melee_five else 'Empty'
-        self._cells[5][0] = self.ranged_six.name if self.ranged_six else 'Empty'
-        self._cells[5][-1] = self.melee_six.name if self.melee_six else 'Empty'
-        self._cells[6][0] = self.ranged_seven.name if self.ranged_seven else 'Empty'
-        self._cells[6][-1] = self.melee_seven.name if self.melee_seven else 'Empty'
-        self._cells[7][0] = self.ranged_eight.name if self.ranged_eight else 'Empty'
-        self._cells[7][-1] = self.melee_eight.name if self.melee_eight else 'Empty'
-        self._cells[8][0] = self.ranged_nine.name if self.ranged_nine else 'Empty'
-        self._cells[8][-1] = self.melee_nine.name if self.melee_nine else 'Empty'
-        self._cells[9][0] = self.ranged_ten.name if self.ranged_ten else 'Empty'
-        self._cells[9][-1] = self.melee_ten.name if self.melee_ten else 'Empty'
-        self._cells[10][0] = self.ranged_eleven.name if self.ranged_eleven else 'Empty'
-        self._cells[11][0] = self.ranged_twelve.name if self.ranged_twelve else 'Empty'
-        self._cells[12][0] = self.ranged_thirteen.name if self.ranged_thirteen else 'Empty'
-        self._cells[13][0] = self.ranged_fourteen.name if self.ranged_fourteen else 'Empty'
-        self._cells[14][0] = self.ranged_fifteen.name if self.ranged_fifteen else 'Empty'
-        write_range(SHEET_ID, 'BWD Assigns!AV97:BG111', self._cells)
+    def score(self) -> float:
+        return sum(self.spot_cost(raider, spot) for spot, raider in self.slot_values().items() if raider is not None)
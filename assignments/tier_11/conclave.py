@@ -1,117 +1,76 @@
-from pydantic import BaseModel
-
+from assignments.constraints import INFEASIBLE, GroupSolver
 from assignments.core import Assignment
-from google_sheets import SHEET_ID, get_range, write_range
-from roster import RaidRoster, WowClass
+from assignments.layout import Group, Layout, LayoutBoss
+from roster import Raider, Role, WowClass
+
+PLATFORMS = ['anshal', 'rohash', 'nezir']
+PLATFORM_SIZE = 15
+LAYOUT = Layout(
+    anchor='TotFW Assigns!AU19:BO33',
+    groups=(
+        Group('anshal', 0, 1, PLATFORM_SIZE),
+        Group('rohash', 0, 8, PLATFORM_SIZE),
+        Group('nezir', 0, 15, PLATFORM_SIZE),
+    ),
+)
+HEALERS = {'anshal': 2, 'rohash': 1, 'nezir': 2}
+OFF_PLATFORM = 5
+NO_HEALER = 20
 
 
-class Conclave(BaseModel):
-    roster: RaidRoster
+class Conclave(LayoutBoss):
+    LAYOUT = LAYOUT
+
     anshal: Assignment = Assignment()
     rohash: Assignment = Assignment()
     nezir: Assignment = Assignment()
-    _cells: list[list[str]] | None = None
+    flex_healers: int = 0
+
+    def is_healer(self, raider: Raider) -> bool:
+        return raider.role == Role.HEALERS or raider.flex_healer is not None and raider.flex_healer < self.flex_healers
 
-    class Config:
-        arbitrary_types_allowed = True
+    def platform_cost(self, raider: Raider, platform: str) -> float:
+        """The main tank goes to Nezir and the other tanks to Anshal, Nezir only gets healers and dps lean to their usual platform."""
+        if raider.main_tank:
+            return 0 if platform == 'nezir' else INFEASIBLE
+        if raider.role == Role.TANKS:
+            return 0 if platform == 'anshal' else INFEASIBLE
+        if self.is_healer(raider):
+            if raider.wow_class in [WowClass.SHAMAN.value, WowClass.PALADIN.value]:
+                return 0 if platform == 'nezir' else 1
+            return 1 if platform == 'nezir' else 0
+        if platform == 'nezir':
+            return INFEASIBLE
+        if raider.spec in ['retribution', 'enhancement', 'feral'] or raider.wow_class in [WowClass.ROGUE.value, WowClass.WARLOCK.value]:
+            return 0 if platform == 'rohash' else OFF_PLATFORM
+        if raider.wow_class == WowClass.HUNTER.value:
+            return 0 if platform == 'anshal' else OFF_PLATFORM
+        return 0
 
-    def get_assignments(self):
-        for raider in self.roster:
-            raider.position_set = False
-        self._cells = get_range(SHEET_ID, 'TotFW Assigns!AU19:BO33')
-        for row in self._cells:
-            anshal = self.roster.get_raider_by_name(row[1])
-            if anshal is not None:
-                self.anshal.append(anshal)
-                anshal.position_set = True
-            rohash = self.roster.get_raider_by_name(row[8])
-            if rohash is not None:
-                self.rohash.append(rohash)
-                rohash.position_set = True
-            nezir = self.roster.get_raider_by_name(row[15])
-            if nezir is not None:
-                self.nezir.append(nezir)
-                nezir.position_set = True
+    def solver(self) -> GroupSolver:
+        """The platforms as a GroupSolver, with the raiders already on the sheet pinned."""
+        solver = GroupSolver({platform: PLATFORM_SIZE for platform in PLATFORMS})
+        for platform in PLATFORMS:
+            for raider in getattr(self, platform):
+                solver.pin(platform, raider)
+            solver.at_least(platform, self.is_healer, HEALERS[platform], weight=NO_HEALER, name=f'{HEALERS[platform]} healers on {platform}')
+        solver.at_most('nezir', self.is_healer, HEALERS['nezir'], name='nezir healers')
+        # anshal and rohash stay balanced
+        solver.size_cost('anshal', list(range(PLATFORM_SIZE)))
+        solver.size_cost('rohash', list(range(PLATFORM_SIZE)))
+        solver.prefer(self.platform_cost)
+        return solver
 
     def optimize(self):
         tank = self.roster.get_tank(main_tank=True)
-        if not tank.position_set:
+        if not self.roster.is_set(tank):
             self.nezir.append(tank)
-            tank.position_set = True
-        for tank in self.roster.get_tanks():
-            if not tank.position_set:
-                self.anshal.append(tank)
-                tank.position_set = True
-
-        for healer in self.roster.get_healers():
-            if healer.position_set:
-                continue
-            if healer.wow_class in [WowClass.SHAMAN.value, WowClass.PALADIN.value] and self.nezir.healer_count() < 2:
-                if self.nezir.healer_count() < 2:
-                    self.nezir.append(healer)
-                    healer.position_set = True
-            else:
-                if not self.anshal.healer_count() < 2:
-                    self.anshal.append(healer)
-                    healer.position_set = True
-                elif not self.rohash.healer_count() < 1:
-                    self.rohash.append(healer)
-                    healer.position_set = True
-                elif self.nezir.healer_count() < 2:
-                    self.nezir.append(healer)
-                    healer.position_set = True
-            if not healer.position_set:
-                spot = min([self.anshal, self.rohash, self.nezir], key=len)
-                spot.append(healer)
-                healer.position_set = True
-
-        for raider in self.roster.get_melee():
-            if raider.position_set:
-                continue
-            if raider.spec in ['Retribution', 'Enhancement', 'Feral'] or raider.wow_class == WowClass.ROGUE.value:
-                self.rohash.append(raider)
-            else:
-                spot = min([self.rohash, self.anshal], key=len)
-                spot.append(raider)
-            raider.position_set = True
-        for raider in self.roster.get_ranged():
-            if raider.position_set:
-                continue
-            if raider.wow_class == WowClass.WARLOCK.value:
-                self.rohash.append(raider)
-            elif raider.wow_class == WowClass.HUNTER.value:
-                self.anshal.append(raider)
-            else:
-                spot = min([self.rohash, self.anshal], key=len)
-                spot.append(raider)
-            raider.position_set = True
-
+            self.roster.set_position(tank)
+        raiders = [raider for raider in self.roster if not self.roster.is_set(raider)]
+        for platform, placed in self.solver().solve(raiders).items():
+            for raider in placed:
+                getattr(self, platform).append(raider)
+                self.roster.set_position(raider)
 
-    def write(self):
-        if self._cells is None:
-            self._cells = get_range(SHEET_ID, 'TotFW Assigns!AU19:BO33')
-        for i, raider in enumerate(self.anshal):
-            try:
-                if raider:
-                    self._cells[i][1] = raider.name
-                else:
-                    self._cells[i][1] = 'Empty'
-            except IndexError:
-                print(f'{raider.name} does not have a spot ({i})')
-        for i, raider in enumerate(self.rohash):
-            try:
-                if raider:
-                    self._cells[i][8] = raider.name
-                else:
-                    self._cells[i][8] = 'Empty'
-            except IndexError:
-                print(f'{raider.name} does not have a spot ({i})')
-        for i, raider in enumerate(self.nezir):
-            try:
-                if raider:
-                    self._cells[i][15] = raider.name
-                else:
-                    self._cells[i][15] = 'Empty'
-            except IndexError:
-                print(f'{raider.name} does not have a spot ({i})')
-        write_range(SHEET_ID, 'TotFW Assigns!AU19:BO33', self._cells)
\ No newline at end of file
+    def score(self) -> float:
+        return self.solver().score()
@@ -1,20 +1,24 @@
-from copy import deepcopy
-
+from assignments.cache import SolutionCache
+from assignments.runner import run_tier, update_tier
 from assignments.tier_11.alakir import AlAkir
 from assignments.tier_11.chimaeron import Chimaeron
 from assignments.tier_11.conclave import Conclave
-from google_sheets import SHEET_ID, clear_format
-from roster import RaidRoster
+from google_sheets import SHEET_ID
+from run_config import RunConfig
+
+GIDS = ['1211611579', '278294734', '44485663']
+BOSSES = [AlAkir, Chimaeron, Conclave]
 
 
-def run(raid_id: int):
+def run(
+    raid_id: int,
+    sheet_id: str = SHEET_ID,
+    gids: list[str] = GIDS,
+    config: RunConfig | None = None,
+    incremental: bool = False,
+    cache: SolutionCache | None = None,
+):
     """Run function for tier 11"""
-    roster = RaidRoster.from_raid_plan(raid_id)
-    clear_format(SHEET_ID)
-    roster.conditional_format()
-    for Boss in [AlAkir, Chimaeron, Conclave]:
-    # for Boss in [Conclave]:
-        boss = Boss(roster=deepcopy(roster))
-        boss.get_assignments()
-        boss.optimize()
-        boss.write()
+    if incremental:
+        return update_tier(raid_id, sheet_id, BOSSES, gids=gids, config=config)
+    run_tier(raid_id, sheet_id, BOSSES, gids=gids, config=config, cache=cache)
@@ -1,26 +1,52 @@
 import logging
+from typing import ClassVar
 
 from pydantic import BaseModel
 
+from assignments.balancer import GroupBalancer
 from assignments.core import Assignment
+from google_sheets import WriteBuffer
 from roster import RaidRoster, Raider, Role, RaiderUnavailable
 
 LOGGER = logging.getLogger(__name__)
 
+SOAKERS = [
+    'unholy death knight',
+    'feral druid',
+    'arms warrior',
+    'fury warrior',
+    'retribution paladin',
+]
+MELEE_GROUPS = ['melee_group_one', 'melee_group_two', 'melee_group_three']
+
+
+def soaker_count(group: Assignment) -> int:
+    return sum([
+        group.has_death_knight(),
+        group.has_druid(spec='feral'),
+        group.has_warrior(),
+        group.has_paladin(spec='retribution'),
+    ])
+
 
 class Bethtilac(BaseModel):
+    RANGES: ClassVar[list[str]] = []
+
     roster: RaidRoster
     bethtilac_tank: Raider = None
     bethtilac_healer: Raider = None
     drone_tank: Raider = None
     drone_healer: Raider = None
-    drone_dps: Assignment = None
-    bethtilac_dps: Assignment = None
-    melee_group_one: Assignment = None
-    melee_group_two: Assignment = None
-    melee_group_three: Assignment = None
+    drone_dps: Assignment = Assignment()
+    bethtilac_dps: Assignment = Assignment()
+    melee_group_one: Assignment = Assignment()
+    melee_group_two: Assignment = Assignment()
+    melee_group_three: Assignment = Assignment()
+
+    class Config:
+        arbitrary_types_allowed = True
 
-    def get_assignments(self):
+    def get_assignments(self, snapshot: dict[str, list[list[str]]]):
         pass
 
     def optimize(self):
@@ -32,95 +58,64 @@ class Bethtilac(BaseModel):
         self.assign_bethtilac_dps()
         self.assign_melee_groups()
 
-    def write(self):
+    def write(self, buffer: WriteBuffer, sheet_id: str):
         pass
 
     def assign_bethtilac_tank(self):
         if self.bethtilac_tank:
             return
         self.bethtilac_tank = self.roster.get_tank(main_tank=True)
-        self.bethtilac_tank.position_set = True
+        self.roster.set_position(self.bethtilac_tank)
 
     def assign_bethtilac_healer(self):
         if self.bethtilac_healer:
             return
         self.bethtilac_healer = self.roster.get_healer(preferred=['restoration shaman'])
-        self.bethtilac_healer.position_set = True
+        self.roster.set_position(self.bethtilac_healer)
 
     def assign_drone_tank(self):
         if self.drone_tank:
             return
         self.drone_tank = self.roster.get_tank()
-        self.drone_tank.position_set = True
+        self.roster.set_position(self.drone_tank)
 
     def assign_drone_healer(self):
         if self.drone_healer:
             return
-        self.drone_healer = self.roster.get_healer(preferred=['holy_paladin'])
-        self.drone_healer.position_set = True
+        self.drone_healer = self.roster.get_healer(preferred=['holy paladin'])
+        self.roster.set_position(self.drone_healer)
 
     def assign_drone_dps(self):
         if self.drone_dps:
             return
-        self.drone_dps = self.roster.get_dps(preferred=['shadow priest', 'balance druid'])
+        self.drone_dps = Assignment(self.roster.get_raiders(preferred=['shadow priest', 'balance druid'], strict=True))
         for dps in self.drone_dps:
-            dps.position_set = True
+            self.roster.set_position(dps)
 
     def assign_bethtilac_dps(self):
         if self.bethtilac_dps:
             return
         self.bethtilac_dps.extend(list(self.roster.get_rogues()))
         for dps in self.bethtilac_dps:
-            dps.position_set = True
+            self.roster.set_position(dps)
 
     def assign_melee_groups(self):
-        def group_has_soaker(group: Assignment):
-            return any([
-                group.has_death_knight(),
-                group.has_druid(spec='feral'),
-                group.has_warrior(),
-                group.has_paladin(spec='retribution')
-            ])
-
-        def soaker_count(group: Assignment):
-            return sum([
-                group.has_death_knight(),
-                group.has_druid(spec='feral'),
-                group.has_warrior(),
-                group.has_paladin(spec='retribution')
-            ])
-
-        for melee_group in [self.melee_group_one, self.melee_group_two, self.melee_group_three]:
-            if not group_has_soaker(melee_group):
+        groups = {name: getattr(self, name) for name in MELEE_GROUPS}
+        for melee_group in groups.values():
+            if not soaker_count(melee_group):
                 try:
-                    raider = self.roster.get_raider(
-                        preferred=[
-                            'unholy death knight',
-                            'feral druid',
-                            'arms warrior',
-                            'fury warrior',
-                            'retribution paladin',
-                        ],
-                        strict=True,
-                    )
+                    raider = self.roster.get_raider(preferred=SOAKERS, strict=True)
                     melee_group.append(raider)
-                    raider.position_set = True
+                    self.roster.set_position(raider)
                 except RaiderUnavailable:
                     LOGGER.warning('No soaker available for melee group')
                     pass
-        for soaker in self.roster.get_raiders(
-                preferred=[
-                    'unholy death knight',
-                    'feral druid',
-                    'arms warrior',
-                    'fury warrior',
-                    'retribution paladin',
-                ],
-                strict=True,
-        ):
-            sorted([self.melee_group_one, self.melee_group_two, self.melee_group_three], key=soaker_count)[0].append(soaker)
-            soaker.position_set = True
+        soakers = GroupBalancer(groups, key=lambda group: (soaker_count(group), len(group)))
+        for soaker in self.roster.get_raiders(preferred=SOAKERS, strict=True):
+            soakers.add(soaker)
+            self.roster.set_position(soaker)
+        melee = GroupBalancer(groups)
         for dps in self.roster.get_raiders(role=Role.MELEE):
-            if not dps.position_set:
-                sorted([self.melee_group_one, self.melee_group_two, self.melee_group_three], key=len)[0].append(dps)
-                dps.position_set = True
+            if not self.roster.is_set(dps):
+                melee.add(dps)
+                self.roster.set_position(dps)
@@ -1,17 +1,22 @@
-from copy import deepcopy
-
+from assignments.cache import SolutionCache
+from assignments.runner import run_tier, update_tier
 from assignments.tier_12.shannox import Shannox
-from google_sheets import clear_format, format_cells
-from roster import RaidRoster
+from run_config import RunConfig
+
+SHEET_ID = '1TsJs4OEHpDDELNDQWK2eoy1KIiIPcBWDHQV3JmxS3Dc'
+GIDS = ['0', '448537128', '2029521756', '1486593943', '281589537', '409532693', '350226198']
+BOSSES = [Shannox]
 
 
-def run(raid_id: int, sheet_id: str, gids: list[str]):
+def run(
+    raid_id: int,
+    sheet_id: str = SHEET_ID,
+    gids: list[str] = GIDS,
+    config: RunConfig | None = None,
+    incremental: bool = False,
+    cache: SolutionCache | None = None,
+):
     """Run function for tier 12"""
-    roster = RaidRoster.from_raid_plan(raid_id)
-    # clear_format(sheet_id)
-    # roster.conditional_format(sheet_id, gids)
-    for Boss in [Shannox]:
-        boss = Boss(roster=deepcopy(roster))
-        boss.get_assignments()
-        boss.optimize()
-        boss.write(sheet_id)
+    if incremental:
+        return update_tier(raid_id, sheet_id, BOSSES, config=config)
+    run_tier(raid_id, sheet_id, BOSSES, config=config, cache=cache)
@@ -1,11 +1,32 @@
-from pydantic import BaseModel
+from assignments.cooldowns import CooldownScheduler
+from assignments.layout import Layout, LayoutBoss, Slot
+from roster import Raider
 
-from google_sheets import write_range
-from roster import RaidRoster, Raider
+FLARES = ['one', 'two', 'three', 'four']
+# seconds into the fight, approximate
+FLARE_TIMES = [60, 120, 180, 240]
+COOLDOWNS_PER_FLARE = 2
+# cost of a slot left empty
+EMPTY_SLOT = 100
+# names in D and I, spec icons in C and M
+LAYOUT = Layout(
+    anchor='Shannox!C7:M19',
+    slots=(
+        Slot('shannox_tank', 0, 1, icon=0),
+        Slot('shannox_healer', 0, 6, icon=10),
+        Slot('riplimb_tank', 1, 1, icon=0),
+        Slot('riplimb_healer', 1, 6, icon=10),
+        Slot('rageface_healer', 3, 6, icon=10),
+        *(Slot(f'flare_{number}_melee', 9 + i, 1, icon=0) for i, number in enumerate(FLARES)),
+        *(Slot(f'flare_{number}_ranged', 9 + i, 6, icon=10) for i, number in enumerate(FLARES)),
+    ),
+    empty_icon='https://cdn.discordapp.com/emojis/1161060152842125372.webp?size=240&quality=lossless',
+)
 
 
-class Shannox(BaseModel):
-    roster: RaidRoster
+class Shannox(LayoutBoss):
+    LAYOUT = LAYOUT
+
     shannox_tank: Raider | None = None
     shannox_healer: Raider | None = None
     riplimb_tank: Raider | None = None
@@ -15,9 +36,8 @@ class Shannox(BaseModel):
     flare_cd_two: tuple[Raider] | None = None
     flare_cd_three: tuple[Raider] | None = None
     flare_cd_four: tuple[Raider] | None = None
-
-    def get_assignments(self):
-        pass
+    flare_cds: list[tuple[Raider, ...]] = []
+    flex_healers: int = 0
 
     def optimize(self):
         self.assign_shannox_tank()
@@ -27,74 +47,61 @@ class Shannox(BaseModel):
         self.assign_rageface_healer()
         self.assign_flare_cds()
 
-    def write(self, sheet_id: str):
-        write_range(sheet_id, 'Shannox!C7:G7', [[f'=image("{self.shannox_tank.spec_link}")', self.shannox_tank.name]])
-        write_range(sheet_id, 'Shannox!I7:M7', [[self.shannox_healer.name,'','','', f'=image("{self.shannox_healer.spec_link}")']])
-        write_range(sheet_id, 'Shannox!C8:G8', [[f'=image("{self.riplimb_tank.spec_link}")', self.riplimb_tank.name]])
-        write_range(sheet_id, 'Shannox!I8:M8', [[self.riplimb_healer.name,'','','', f'=image("{self.riplimb_healer.spec_link}")']])
-        write_range(sheet_id, 'Shannox!I10:M10', [[self.rageface_healer.name,'','','', f'=image("{self.rageface_healer.spec_link}")']])
-
-        def get_cells(assignment, ranged=False):
-            if not assignment:
-                if not ranged:
-                    return [[f'=image("https://cdn.discordapp.com/emojis/1161060152842125372.webp?size=240&quality=lossless")','Empty']]
-                else:
-                    return [['Empty','','','', f'=image("https://cdn.discordapp.com/emojis/1161060152842125372.webp?size=240&quality=lossless")']]
-            if ranged and len(assignment) > 1:
-                return [[assignment[1].name,'','','', f'=image("{assignment[1].spec_link}")']]
-            elif ranged:
-                return [[assignment[0].name,'','','', f'=image("{assignment[0].spec_link}")']]
-            else:
-                return [[f'=image("{assignment[0].spec_link}")', assignment[0].name]]
+    def get_assignments(self, snapshot: dict[str, list[list[str]]]):
+        super().get_assignments(snapshot)
+        # flare rows have no fields, read them back so writing them again keeps them
+        slots = self.table().read_slots(self._cells, self.roster)
+        self.set_flare_cds([
+            tuple(dict.fromkeys(raider for raider in [slots[f'flare_{number}_melee'], slots[f'flare_{number}_ranged']] if raider))
+            for number in FLARES
+        ])
 
-        write_range(sheet_id, 'Shannox!C16:G16', get_cells(self.flare_cd_one))
-        write_range(sheet_id, 'Shannox!I16:M16', get_cells(self.flare_cd_one, ranged=True))
-        write_range(sheet_id, 'Shannox!C17:G17', get_cells(self.flare_cd_two))
-        write_range(sheet_id, 'Shannox!I17:M17', get_cells(self.flare_cd_two, ranged=True))
-        write_range(sheet_id, 'Shannox!C18:G18', get_cells(self.flare_cd_three))
-        write_range(sheet_id, 'Shannox!I18:M18', get_cells(self.flare_cd_three, ranged=True))
-        write_range(sheet_id, 'Shannox!C19:G19', get_cells(self.flare_cd_four))
-        write_range(sheet_id, 'Shannox!I19:M19', get_cells(self.flare_cd_four, ranged=True))
+    def slot_values(self) -> dict[str, Raider | None]:
+        values = super().slot_values()
+        for number, cooldowns in zip(FLARES, self.flare_cds):
+            values[f'flare_{number}_melee'] = cooldowns[0] if cooldowns else None
+            values[f'flare_{number}_ranged'] = cooldowns[-1] if cooldowns else None
+        return values
 
     def assign_shannox_tank(self):
         if self.shannox_tank:
             return
         self.shannox_tank = self.roster.get_tank(main_tank=True)
-        self.shannox_tank.position_set = True
+        self.roster.set_position(self.shannox_tank)
 
     def assign_shannox_healer(self):
         if self.shannox_healer:
             return
-        self.shannox_healer = self.roster.get_tank_healer()
-        self.shannox_healer.position_set = True
+        self.shannox_healer = self.roster.get_tank_healer(flex=self.flex_healers)
+        self.roster.set_position(self.shannox_healer)
 
     def assign_riplimb_tank(self):
         if self.riplimb_tank:
             return
         self.riplimb_tank = self.roster.get_tank()
-        self.riplimb_tank.position_set = True
+        self.roster.set_position(self.riplimb_tank)
 
     def assign_riplimb_healer(self):
         if self.riplimb_healer:
             return
-        self.riplimb_healer = self.roster.get_tank_healer()
-        self.riplimb_healer.position_set = True
+        self.riplimb_healer = self.roster.get_tank_healer(flex=self.flex_healers)
+        self.roster.set_position(self.riplimb_healer)
 
     def assign_rageface_healer(self):
         if self.rageface_healer:
             return
-        self.rageface_healer = self.roster.get_healer(preferred=['Discipline Priest'])
-        self.rageface_healer.position_set = True
+        self.rageface_healer = self.roster.get_healer(preferred=['discipline priest'], flex=self.flex_healers)
+        self.roster.set_position(self.rageface_healer)
+
+    def assign_flare_cds(self, times: list[float] = FLARE_TIMES):
+        scheduler = CooldownScheduler(self.roster.raid_cooldowns())
+        rotation = scheduler.schedule(times, per_event=COOLDOWNS_PER_FLARE)
+        self.set_flare_cds([tuple(cooldown.raider for cooldown in casts) for casts in rotation])
+
+    def set_flare_cds(self, flare_cds: list[tuple[Raider, ...]]):
+        self.flare_cds = flare_cds
+        flare_cds = [x or None for x in flare_cds] + [None] * len(FLARES)
+        self.flare_cd_one, self.flare_cd_two, self.flare_cd_three, self.flare_cd_four = flare_cds[:len(FLARES)]
 
-    def assign_flare_cds(self):
-        i = 0
-        for cooldowns in self.roster.get_raid_cooldowns(can_stack=False):
-            i += 1
-            if i == 1:
-                self.flare_cd_one = cooldowns
-            elif i == 2:
-                self.flare_cd_two = cooldowns
-            elif i == 3:
-                self.flare_cd_three = cooldowns
-            elif i == 4:
-                self.flare_cd_four = cooldowns
+    def score(self) -> float:
+        return EMPTY_SLOT * sum(1 for raider in self.slot_values().values() if raider is None)
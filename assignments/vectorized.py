@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from assignments.scoring import INFEASIBLE, ScoreModel
+from roster import SPEC_INFO, Raider, Role, WowClass
+
+ROLES = list(Role)
+WOW_CLASSES = [wow_class.value for wow_class in WowClass]
+# keyed on class and spec, frost mages and frost death knights are different specs
+SPECS = list(dict.fromkeys(f'{spec} {wow_class.value}' for _, wow_class, spec in SPEC_INFO.values()))
+HEALER = ROLES.index(Role.HEALERS)
+
+
+def one_hot(indexes: list[int], size: int) -> np.ndarray:
+    matrix = np.zeros((len(indexes), size), dtype=bool)
+    matrix[np.arange(len(indexes)), indexes] = True
+    return matrix
+
+
+@dataclass(frozen=True)
+class RosterFeatures:
+    """A roster as matrices, one row per raider.
+
+    `roles`, `classes` and `specs` are one-hot over ROLES, WOW_CLASSES and
+    SPECS.
+    """
+    raiders: list[Raider]
+    roles: np.ndarray
+    classes: np.ndarray
+    specs: np.ndarray
+
+    @classmethod
+    def from_raiders(cls, raiders: list[Raider]) -> RosterFeatures:
+        raiders = list(raiders)
+        return cls(
+            raiders,
+            one_hot([ROLES.index(raider.role) for raider in raiders], len(ROLES)),
+            one_hot([WOW_CLASSES.index(raider.wow_class) for raider in raiders], len(WOW_CLASSES)),
+            one_hot([SPECS.index(raider.class_and_spec) for raider in raiders], len(SPECS)),
+        )
+
+    def healers(self, flex_healers: list[tuple[str, ...]]) -> np.ndarray:
+        """Which raiders heal with each set of flex healers in, one row per set."""
+        index = {raider.name: i for i, raider in enumerate(self.raiders)}
+        flex = np.zeros((len(flex_healers), len(self.raiders)), dtype=bool)
+        for row, names in enumerate(flex_healers):
+            flex[row, [index[name] for name in names if name in index]] = True
+        return self.roles[:, HEALER] | flex
+
+
+class BatchScorer:
+    """Scores many groupings of the same raiders against a ScoreModel at once.
+
+    A batch is an int array with one row per candidate and one column per
+    raider holding the index of the raider's group in `groups`, -1 for a
+    raider left out, e.g. benched. Predicates and preferences are evaluated
+    once up front; scoring a batch is a matrix product for the term counts
+    and table lookups for their costs. Groups over capacity score INFEASIBLE.
+    """
+
+    def __init__(self, model: ScoreModel, raiders: list[Raider]):
+        self.model = model
+        self.raiders = list(raiders)
+        self.groups = list(model.capacities)
+        self.terms = {term.name: t for t, term in enumerate(model.terms)}
+        n, g = len(self.raiders), len(self.groups)
+
+        # the extra column is the cost of being left out, so -1 indexes it
+        self.preference = np.zeros((n, g + 1))
+        for i, raider in enumerate(self.raiders):
+            for j, group in enumerate(self.groups):
+                self.preference[i, j] = model.preference(raider, group)
+        self.matches = np.array([[term.predicate(raider) for term in model.terms] for raider in self.raiders], dtype=float).reshape(n, len(model.terms))
+        self.pinned = np.array(
+            [[sum(1 for raider in model.pinned.get(group, []) if term.predicate(raider)) for term in model.terms] for group in self.groups],
+            dtype=int,
+        ).reshape(g, len(model.terms))
+        self.room = np.array([model.capacities[group] - len(model.pinned.get(group, [])) for group in self.groups])
+        most = n + (int(self.pinned.max()) if self.pinned.size else 0)
+        self.tables = np.zeros((len(model.terms), g, most + 1))
+        for t, term in enumerate(model.terms):
+            for j, group in enumerate(self.groups):
+                if term.groups is None or group in term.groups:
+                    self.tables[t, j] = [term.cost(k) for k in range(most + 1)]
+
+    def encode(self, grouping: dict[str, list[Raider]]) -> np.ndarray:
+        index = {id(raider): i for i, raider in enumerate(self.raiders)}
+        row = np.full(len(self.raiders), -1, dtype=int)
+        for j, group in enumerate(self.groups):
+            for raider in grouping.get(group, []):
+                row[index[id(raider)]] = j
+        return row
+
+    def decode(self, row: np.ndarray) -> dict[str, list[Raider]]:
+        grouping = {group: [] for group in self.groups}
+        for raider, j in zip(self.raiders, row):
+            if j >= 0:
+                grouping[self.groups[j]].append(raider)
+        return grouping
+
+    def score(self, batch: np.ndarray, overrides: dict[str, np.ndarray] | None = None) -> np.ndarray:
+        """Score every row of `batch`, lower is better.
+
+        `overrides` replaces which raiders match a term, by term name, with a
+        bool column per raider or one per raider and candidate, e.g. the
+        healers of each candidate's flex healer choice. Pinned raiders keep
+        their own matches.
+        """
+        batch = np.atleast_2d(batch)
+        size, n = batch.shape
+        onehot = (batch[:, None, :] == np.arange(len(self.groups))[None, :, None]).astype(float)
+        total = self.preference[np.arange(n), batch].sum(axis=1)
+
+        matches = self.matches
+        if overrides:
+            matches = np.array(np.broadcast_to(matches, (size,) + matches.shape))
+            for name, column in overrides.items():
+                matches[..., self.terms[name]] = column
+        counts = (onehot @ matches).round().astype(int) + self.pinned
+        terms = np.arange(len(self.model.terms))[None, None, :]
+        groups = np.arange(len(self.groups))[None, :, None]
+        total += self.tables[terms, groups, counts].sum(axis=(1, 2))
+
+        total[(onehot.sum(axis=2) > self.room).any(axis=1)] = INFEASIBLE
+        return total
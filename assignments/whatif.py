@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import itertools
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Sequence
+
+import numpy as np
+
+from assignments.cache import SolutionCache
+from assignments.constraints import Unsatisfiable
+from assignments.core import RaidOverfull
+from assignments.vectorized import BatchScorer, RosterFeatures
+from roster import RaidRoster, RaiderUnavailable
+from run_config import RunConfig
+
+LOGGER = logging.getLogger(__name__)
+
+# errors that mean a variant can't be run, rather than a bug
+VARIANT_ERRORS = (Unsatisfiable, RaidOverfull, RaiderUnavailable)
+
+
+@dataclass(frozen=True)
+class Variant:
+    """A roster to try: who sits out, who flexes to healer in flex order, and the main tank."""
+    bench: tuple[str, ...] = ()
+    flex_healers: tuple[str, ...] = ()
+    main_tank: str | None = None
+
+    def config(self, config: RunConfig, bosses: Sequence[type] = ()) -> RunConfig:
+        """`config` with this variant's flex healers and main tank, every boss that has flex healers counting all of them."""
+        options = {name: dict(value) for name, value in config.bosses.items()}
+        for Boss in bosses:
+            if 'flex_healers' in Boss.model_fields:
+                options.setdefault(Boss.__name__.lower(), {})['flex_healers'] = len(self.flex_healers)
+        return config.model_copy(update={
+            'flex_healers': list(self.flex_healers),
+            'main_tank': self.main_tank or config.main_tank,
+            'bosses': options,
+        })
+
+
+@dataclass
+class VariantResult:
+    """How a variant did on each boss.
+
+    `scores` are the bosses' own scores, which are on different scales, and
+    `relative` puts each on 0 for the best variant to 1 for the worst so
+    they can be added up.
+    """
+    variant: Variant
+    scores: dict[str, float] = field(default_factory=dict)
+    relative: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def total(self) -> float:
+        return math.inf if self.error else sum(self.relative.values())
+
+
+def relative(scores: np.ndarray) -> np.ndarray:
+    """`scores` rescaled to 0 for the lowest to 1 for the highest, all 0 if they are equal.
+
+    An infinite score counts as the highest.
+    """
+    scores = np.asarray(scores, dtype=float)
+    finite = np.isfinite(scores)
+    low, high = (scores[finite].min(), scores[finite].max()) if finite.any() else (0, 0)
+    rescaled = (np.where(finite, scores, high) - low) / (high - low) if high > low else np.zeros_like(scores)
+    return np.where(finite, rescaled, 1.0)
+
+
+def rank(results: list[VariantResult]) -> list[VariantResult]:
+    """Fill in every result's relative scores and sort them, best first."""
+    scored = [result for result in results if not result.error]
+    bosses = dict.fromkeys(boss for result in scored for boss in result.scores)
+    for boss in bosses:
+        for result, value in zip(scored, relative(np.array([result.scores[boss] for result in scored]))):
+            result.relative[boss] = float(value)
+    return sorted(results, key=lambda result: result.total)
+
+
+def roster_variants(
+    bench_candidates: Sequence[str] = (),
+    bench_size: int = 0,
+    flex_candidates: Sequence[str] = (),
+    max_flex: int | None = None,
+    main_tanks: Sequence[str] = (),
+) -> list[Variant]:
+    """Every bench of `bench_size` candidates, crossed with every subset of up to
+    `max_flex` flex candidates (in the order given) and every main tank.
+
+    No main tanks tries the config's. A raider is never benched and flexed or
+    main tanking at once.
+    """
+    max_flex = len(flex_candidates) if max_flex is None else max_flex
+    flex_sets = [flex for k in range(max_flex + 1) for flex in itertools.combinations(flex_candidates, k)]
+    variants = []
+    for bench in itertools.combinations(bench_candidates, bench_size):
+        for flex in flex_sets:
+            for main_tank in main_tanks or [None]:
+                if set(bench) & ({*flex, main_tank}):
+                    continue
+                variants.append(Variant(bench, flex, main_tank))
+    return variants
+
+
+def run_variant(rows: list[tuple], config_json: str, bosses: list[type], cache: SolutionCache | None, variant: Variant) -> VariantResult:
+    """Optimize every boss from scratch on `variant` of the roster in `rows` and score it.
+
+    Takes the roster as Raider rows and the config as json so it is cheap to
+    send to a worker process; `cache` travels as its path. Bosses are scored
+    by their `score()`, lower is better; a boss without one counts as 0.
+    """
+    config = variant.config(RunConfig.model_validate_json(config_json), bosses)
+    bench = set(variant.bench)
+    roster = RaidRoster.from_rows([row for row in rows if row[2] not in bench], config)
+    result = VariantResult(variant)
+    for Boss in bosses:
+        boss = Boss(roster=roster.overlay(), **config.boss_options(Boss))
+        try:
+            boss.solve(None, cache)
+        except VARIANT_ERRORS as e:
+            result.error = f'{Boss.__name__}: {e}'
+            return result
+        result.scores[Boss.__name__] = boss.score() if hasattr(boss, 'score') else 0
+    return result
+
+
+def estimate(roster: RaidRoster, bosses: list[type], variants: list[Variant], config: RunConfig | None = None) -> np.ndarray:
+    """A cheap guess at how well each variant does, lower is better, without solving it.
+
+    Every boss with a `solver()` is solved once on the whole roster, and that
+    grouping is scored for all variants at once with a BatchScorer: benched
+    raiders leave their group and each variant's flex healers count toward
+    the boss's healer terms. Main tank choices are not told apart. The
+    guesses are relative per boss and summed, like VariantResult.total, and
+    bosses without a solver don't count.
+    """
+    config = config or RunConfig()
+    raiders = list(roster)
+    index = {raider.name: i for i, raider in enumerate(raiders)}
+    features = RosterFeatures.from_raiders(raiders)
+    healers = features.healers([variant.flex_healers for variant in variants])
+    total = np.zeros(len(variants))
+    for Boss in bosses:
+        if not hasattr(Boss, 'solver'):
+            continue
+        boss = Boss(roster=roster.overlay(), **Variant().config(config, [Boss]).boss_options(Boss))
+        try:
+            boss.optimize()
+        except VARIANT_ERRORS as e:
+            LOGGER.warning(f'not estimating {Boss.__name__}: {e}')
+            continue
+        model = boss.solver().model()
+        grouping, model.pinned = model.pinned, {}
+        scorer = BatchScorer(model, raiders)
+        batch = np.tile(scorer.encode(grouping), (len(variants), 1))
+        for row, variant in zip(batch, variants):
+            row[[index[name] for name in variant.bench if name in index]] = -1
+        is_healer = getattr(boss, 'is_healer', None)
+        overrides = {term.name: healers for term in model.terms if is_healer is not None and term.predicate == is_healer}
+        total += relative(scorer.score(batch, overrides))
+    return total
+
+
+def shortlist(variants: list[Variant], estimates: np.ndarray, size: int) -> list[Variant]:
+    """The `size` variants with the lowest estimates, and any that tie with the last of them."""
+    if size >= len(variants):
+        return variants
+    cutoff = np.sort(estimates)[size - 1]
+    return [variant for variant, guess in zip(variants, estimates) if guess <= cutoff]
+
+
+def what_if(
+    roster: RaidRoster,
+    bosses: list[type],
+    variants: list[Variant],
+    config: RunConfig | None = None,
+    max_workers: int | None = None,
+    cache: SolutionCache | None = None,
+    keep: int | None = None,
+) -> list[VariantResult]:
+    """Run `variants` of `roster` through `bosses` across processes and rank them, best first.
+
+    Nothing is read from or written to the sheet; every variant starts from
+    empty assignments. With `keep`, only the `keep` variants with the best
+    `estimate` are run.
+    """
+    if keep is not None:
+        kept = shortlist(variants, estimate(roster, bosses, variants, config), keep)
+        LOGGER.info(f'running {len(kept)} of {len(variants)} variants')
+        variants = kept
+    run = partial(run_variant, roster.to_rows(), (config or RunConfig()).model_dump_json(), bosses, cache)
+    max_workers = max_workers or os.cpu_count() or 1
+    # a few chunks per worker keeps them busy without sending the roster with every variant
+    chunksize = max(1, len(variants) // (max_workers * 4))
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(run, variants, chunksize=chunksize))
+    return rank(results)
+
+
+def format_results(results: list[VariantResult], limit: int | None = None) -> str:
+    """A plain text table of ranked results, the total relative and each boss's own score."""
+    bosses = list(dict.fromkeys(boss for result in results for boss in result.scores))
+    header = ['#', 'total', *bosses, 'bench', 'flex healers', 'main tank']
+    rows = []
+    for position, result in enumerate(results[:limit], 1):
+        variant = result.variant
+        scores = [f'{result.scores[boss]:g}' if boss in result.scores else '-' for boss in bosses]
+        total = result.error or f'{result.total:.2f}'
+        rows.append([str(position), total, *scores, ', '.join(variant.bench) or '-', ', '.join(variant.flex_healers) or '-', variant.main_tank or '-'])
+    widths = [max(len(row[i]) for row in [header, *rows]) for i in range(len(header))]
+    return '\n'.join('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip() for row in [header, *rows])
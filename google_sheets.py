@@ -1,78 +1,511 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
-from typing import Any
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Callable, TypeVar
 
+import httplib2
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+
+LOGGER = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class SheetsClient:
+    """Process-wide Sheets API client.
+
+    Credentials are loaded from disk once and refreshed in memory when they
+    expire, and the discovery document is only fetched the first time the
+    service is built. Requests go through one authorized http transport per
+    thread (httplib2 is not thread safe), so connections are reused between
+    calls.
+    """
+
+    def __init__(self, token_file: str = 'token.json', secrets_file: str = 'credentials.json'):
+        self.token_file = token_file
+        self.secrets_file = secrets_file
+        self._creds: Credentials | None = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._service = None
+
+    @property
+    def credentials(self) -> Credentials:
+        with self._lock:
+            if self._creds is None:
+                self._creds = get_credentials(self.token_file, self.secrets_file)
+        self.refresh()
+        return self._creds
+
+    def refresh(self) -> None:
+        # the transport also refreshes on a 401, this saves the failed request
+        with self._lock:
+            if self._creds is not None and not self._creds.valid and self._creds.refresh_token:
+                self._creds.refresh(Request())
+
+    @property
+    def http(self) -> AuthorizedHttp:
+        http = getattr(self._local, 'http', None)
+        if http is None:
+            http = self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return http
+
+    @property
+    def spreadsheets(self):
+        # resolved outside the lock, the first call loads the credentials under it
+        http = self.http
+        with self._lock:
+            if self._service is None:
+                self._service = build('sheets', 'v4', http=http)
+        return self._service.spreadsheets()
+
+    def execute(self, request) -> Any:
+        self.refresh()
+        return request.execute(http=self.http)
+
+
+class TokenBucket:
+    """Thread safe token bucket, `rate` tokens a second up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class RequestScheduler:
+    """Paces Sheets requests under the API quotas and retries throttled ones.
+
+    Every request takes a token from each bucket of its kind ('read' or
+    'write'). Requests that fail with a retryable status are retried with
+    jittered exponential backoff, honouring Retry-After when it is sent.
+    Non-idempotent requests are only retried on 429, when Sheets is known
+    not to have applied them; `replay` is for retrying a whole
+    read-modify-write operation instead.
+    """
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, buckets: dict[str, list[TokenBucket]], max_retries: int = 6, base_delay: float = 1.0, max_delay: float = 64.0):
+        self.buckets = buckets
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def for_sheets_quota(cls, **kwargs) -> RequestScheduler:
+        # per user and per project quotas, in requests a minute
+        def buckets(per_user: int, per_project: int) -> list[TokenBucket]:
+            return [TokenBucket(per_user / 60, per_user / 6), TokenBucket(per_project / 60, per_project / 6)]
+        return cls({'read': buckets(60, 300), 'write': buckets(60, 300)}, **kwargs)
+
+    def run(self, kind: str, call: Callable[[], T], idempotent: bool = True) -> T:
+        attempt = 0
+        while True:
+            for bucket in self.buckets[kind]:
+                bucket.acquire()
+            try:
+                return call()
+            except HttpError as e:
+                status = e.resp.status
+                if attempt >= self.max_retries or status not in self.RETRY_STATUSES or not idempotent and status != 429:
+                    raise
+                self._backoff(attempt, e)
+            attempt += 1
+
+    def replay(self, operation: Callable[[], T]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return operation()
+            except HttpError as e:
+                if attempt >= self.max_retries or e.resp.status not in self.RETRY_STATUSES:
+                    raise
+                self._backoff(attempt, e)
+            attempt += 1
+
+    def _backoff(self, attempt: int, error: HttpError) -> None:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        retry_after = error.resp.get('retry-after')
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        LOGGER.warning(f'sheets request failed with {error.resp.status}, retrying in {delay:.1f}s')
+        time.sleep(delay)
+
+
+_client: SheetsClient | None = None
+
+
+def get_client() -> SheetsClient:
+    global _client
+    if _client is None:
+        _client = SheetsClient()
+    return _client
+
+
+class SheetBackend(ABC):
+    """Storage the assignment helpers read from and write to.
+
+    Ranges use A1 notation and grids are lists of rows, as in the Sheets API.
+    `format_cells` takes a spreadsheets.batchUpdate body.
+    """
+
+    @abstractmethod
+    def batch_get(self, sheet_id: str, ranges: list[str]) -> list[list[list[Any]]]:
+        ...
+
+    @abstractmethod
+    def batch_write(self, sheet_id: str, data: list[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def get_conditional_formats(self, sheet_id: str) -> dict[str, list[dict]]:
+        ...
+
+    @abstractmethod
+    def format_cells(self, sheet_id: str, data: dict) -> None:
+        ...
+
+    def replay(self, operation: Callable[[], T]) -> T:
+        """Run a read-modify-write operation, rerunning all of it if a step fails transiently."""
+        return operation()
+
+
+class GoogleSheetsBackend(SheetBackend):
+    def __init__(self, client: SheetsClient | None = None, scheduler: RequestScheduler | None = None):
+        self.client = client or SheetsClient()
+        self.scheduler = scheduler or RequestScheduler.for_sheets_quota()
+
+    def _execute(self, kind: str, request, idempotent: bool = True) -> Any:
+        return self.scheduler.run(kind, lambda: self.client.execute(request), idempotent=idempotent)
+
+    def replay(self, operation: Callable[[], T]) -> T:
+        return self.scheduler.replay(operation)
+
+    def batch_get(self, sheet_id: str, ranges: list[str]) -> list[list[list[Any]]]:
+        # formulas, not what they show, so written =image(...) cells read back equal
+        result = self._execute('read', self.client.spreadsheets.values().batchGet(spreadsheetId=sheet_id, ranges=ranges, valueRenderOption='FORMULA'))
+        return [value_range.get('values', []) for value_range in result.get('valueRanges', [])]
+
+    def batch_write(self, sheet_id: str, data: list[dict]) -> None:
+        # values are absolute, so replaying the whole batch is safe
+        self._execute('write', self.client.spreadsheets.values().batchUpdate(
+            spreadsheetId=sheet_id,
+            body={'valueInputOption': 'USER_ENTERED', 'data': data},
+        ))
+
+    def get_conditional_formats(self, sheet_id: str) -> dict[str, list[dict]]:
+        sheet_data = self._execute('read', self.client.spreadsheets.get(
+            spreadsheetId=sheet_id,
+            fields='sheets(properties(sheetId),conditionalFormats)',
+        ))
+        return {
+            str(sheet_response['properties'].get('sheetId', 0)): sheet_response.get('conditionalFormats', [])
+            for sheet_response in sheet_data['sheets']
+        }
+
+    def format_cells(self, sheet_id: str, data: dict) -> None:
+        # rule requests are positional, a replay could delete the wrong rule
+        self._execute('write', self.client.spreadsheets.batchUpdate(spreadsheetId=sheet_id, body=data), idempotent=False)
+
+
+_backend: SheetBackend | None = None
+
+
+def get_backend() -> SheetBackend:
+    """The backend selected by SHEETS_BACKEND ('google' or 'local'), created on first use.
+
+    The local backend keeps spreadsheets in SHEETS_LOCAL_DIR, or in memory
+    when that is not set.
+    """
+    global _backend
+    if _backend is None:
+        kind = os.environ.get('SHEETS_BACKEND', 'google')
+        if kind == 'google':
+            _backend = GoogleSheetsBackend(get_client())
+        elif kind == 'local':
+            from local_sheets import LocalSheetsBackend
+            _backend = LocalSheetsBackend(os.environ.get('SHEETS_LOCAL_DIR'))
+        else:
+            raise ValueError(f'unknown sheets backend {kind}')
+    return _backend
+
+
+def set_backend(backend: SheetBackend | None) -> None:
+    global _backend
+    _backend = backend
 
 
 def clear_format(sheet_id):
-    creds = get_credentials()
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
-    sheet_data = sheet.get(spreadsheetId=sheet_id).execute()
+    get_backend().replay(lambda: _clear_format(sheet_id))
+
+
+def _clear_format(sheet_id: str) -> None:
     data = {'requests': []}
-    for sheet_response in sheet_data['sheets']:
-        if 'conditionalFormats' not in sheet_response:
-            continue
-        for i, cformat in enumerate(sheet_response['conditionalFormats']):
-            data['requests'].append({'deleteConditionalFormatRule': {'sheetId': cformat['ranges'][0].get('sheetId', '0'), 'index': 0}})
+    for gid, cformats in get_backend().get_conditional_formats(sheet_id).items():
+        for cformat in cformats:
+            data['requests'].append({'deleteConditionalFormatRule': {'sheetId': int(gid), 'index': 0}})
     if data['requests']:
-        sheet.batchUpdate(spreadsheetId=sheet_id, body=data).execute()
+        format_cells(sheet_id, data)
+
+
+def sync_conditional_formats(sheet_id: str, rules: dict[str, list[dict]]) -> None:
+    """Make the conditional format rules on each listed sheet match `rules`.
+
+    `rules` maps a sheet gid to the rules it should have. Existing rules that
+    are still wanted are left alone, the rest are deleted and the missing ones
+    added, all in a single batchUpdate. Sheets that are not listed are not
+    touched.
+    """
+    get_backend().replay(lambda: _sync_conditional_formats(sheet_id, rules))
+
+
+def _sync_conditional_formats(sheet_id: str, rules: dict[str, list[dict]]) -> None:
+    existing = get_backend().get_conditional_formats(sheet_id)
+    data = {'requests': []}
+    for gid, wanted in rules.items():
+        missing = {_rule_key(rule): rule for rule in wanted}
+        current = existing.get(str(gid), [])
+        deletes = []
+        for i, rule in enumerate(current):
+            if missing.pop(_rule_key(rule), None) is None:
+                deletes.append(i)
+        data['requests'].extend(
+            {'deleteConditionalFormatRule': {'sheetId': int(gid), 'index': i}}
+            for i in reversed(deletes)
+        )
+        kept = len(current) - len(deletes)
+        data['requests'].extend(
+            {'addConditionalFormatRule': {'rule': rule, 'index': kept + i}}
+            for i, rule in enumerate(missing.values())
+        )
+    if data['requests']:
+        format_cells(sheet_id, data)
+
+
+def _rule_key(rule: dict) -> tuple:
+    # the API leaves out zero values and colour channels when it echoes a rule back
+    ranges = tuple(
+        (
+            int(x.get('sheetId', 0)),
+            x.get('startRowIndex', 0),
+            x.get('endRowIndex'),
+            x.get('startColumnIndex', 0),
+            x.get('endColumnIndex'),
+        )
+        for x in rule.get('ranges', [])
+    )
+    boolean_rule = rule.get('booleanRule', {})
+    condition = boolean_rule.get('condition', {})
+    color = boolean_rule.get('format', {}).get('backgroundColor', {})
+    return (
+        ranges,
+        condition.get('type'),
+        tuple(x.get('userEnteredValue') for x in condition.get('values', [])),
+        tuple(round(color.get(x, 0), 3) for x in ('red', 'green', 'blue')),
+    )
 
 
 def format_cells(sheet_id: str, data: dict) -> None:
-    creds = get_credentials()
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
-    sheet.batchUpdate(spreadsheetId=sheet_id, body=data).execute()
+    get_backend().format_cells(sheet_id, data)
 
 
 def write_range(sheet_id: str, cell_range: str, cells=list[list[any]]) -> None:
-    creds = get_credentials()
-    service = build("sheets", "v4", credentials=creds)
-    sheet = service.spreadsheets()
-    sheet.values().update(
-        spreadsheetId=sheet_id,
-        range=cell_range,
-        # valueInputOption='RAW',
-        valueInputOption='USER_ENTERED',
-        body={'majorDimension': 'ROWS', 'values': cells},
-    ).execute()
+    batch_write(sheet_id, [{'range': cell_range, 'majorDimension': 'ROWS', 'values': cells}])
+
+
+class WriteBuffer:
+    """Collects value writes and sends them as one batchUpdate per spreadsheet.
+
+    Can be used as a context manager, in which case everything added inside
+    the block is committed when it exits cleanly.
+    """
+
+    def __init__(self):
+        self._pending: dict[str, list[dict]] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> WriteBuffer:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.commit()
+
+    def __len__(self) -> int:
+        return sum(len(x) for x in self._pending.values())
+
+    def add(self, sheet_id: str, cell_range: str, cells: list[list[Any]]) -> None:
+        with self._lock:
+            self._pending.setdefault(sheet_id, []).append({'range': cell_range, 'majorDimension': 'ROWS', 'values': cells})
+
+    def add_changes(self, sheet_id: str, cell_range: str, old: list[list[Any]], new: list[list[Any]]) -> None:
+        """Add only the parts of `new` that differ from `old`, the grid last read from `cell_range`."""
+        for sub_range, cells in changed_ranges(cell_range, old, new):
+            self.add(sheet_id, sub_range, cells)
+
+    def commit(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for sheet_id, data in pending.items():
+            batch_write(sheet_id, data)
+
+
+def changed_ranges(cell_range: str, old: list[list[Any]], new: list[list[Any]]) -> list[tuple[str, list[list[Any]]]]:
+    """Find the sub-ranges of `cell_range` whose cells differ between two grids.
+
+    Changed cells are grouped into runs along each row, and runs covering the
+    same columns on consecutive rows are merged into one rectangle.
+    """
+    sheet, start_row, start_column, _, _ = parse_range(cell_range)
+    blocks: list[list[int]] = []  # [first row, last row, first column, last column]
+    open_blocks: dict[tuple[int, int], list[int]] = {}
+    for i, row in enumerate(new):
+        old_row = old[i] if i < len(old) else []
+        runs = []
+        j = 0
+        while j < len(row):
+            if j < len(old_row) and row[j] == old_row[j]:
+                j += 1
+                continue
+            k = j
+            while k + 1 < len(row) and (k + 1 >= len(old_row) or row[k + 1] != old_row[k + 1]):
+                k += 1
+            runs.append((j, k))
+            j = k + 1
+        next_blocks = {}
+        for run in runs:
+            block = open_blocks.get(run)
+            if block is not None and block[1] == i - 1:
+                block[1] = i
+            else:
+                block = [i, i, *run]
+                blocks.append(block)
+            next_blocks[run] = block
+        open_blocks = next_blocks
+    return [
+        (
+            format_range(sheet, start_row + first_row, start_column + first_column, start_row + last_row + 1, start_column + last_column + 1),
+            [new[i][first_column:last_column + 1] for i in range(first_row, last_row + 1)],
+        )
+        for first_row, last_row, first_column, last_column in blocks
+    ]
+
+
+def batch_write(sheet_id: str, data: list[dict]) -> None:
+    get_backend().batch_write(sheet_id, data)
+
+
+def batch_get(sheet_id: str, ranges: list[str]) -> dict[str, list[list[Any]]]:
+    """Fetch several ranges with a single values().batchGet.
+
+    Grids are keyed by the range as it was requested and padded out to the
+    full size of the range, since the API leaves off trailing empty cells.
+    """
+    ranges = list(dict.fromkeys(ranges))
+    if not ranges:
+        return {}
+    return {
+        cell_range: pad_grid(cell_range, cells)
+        for cell_range, cells in zip(ranges, get_backend().batch_get(sheet_id, ranges))
+    }
 
 
 def get_range(sheet_id: str, cell_range: str) -> list[list[Any]]:
-    creds = get_credentials()
-    # try:
-    service = build("sheets", "v4", credentials=creds)
-
-    sheet = service.spreadsheets()
-    result = (
-        sheet.values()
-        .get(spreadsheetId=sheet_id, range=cell_range)
-        .execute()
-    )
-    return result.get("values")
+    return get_backend().batch_get(sheet_id, [cell_range])[0] or None
+
+
+_A1_RE = re.compile(r"^(?:(?P<sheet>.+)!)?(?P<c0>[A-Z]+)(?P<r0>\d+)(?::(?P<c1>[A-Z]+)(?P<r1>\d+))?$")
+
+
+def column_index(letters: str) -> int:
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def column_letters(index: int) -> str:
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+
+def parse_range(cell_range: str) -> tuple[str | None, int, int, int, int]:
+    """Split an A1 range into (sheet, start row, start column, end row, end column).
+
+    Indexes are zero based and the end is exclusive, like a GridRange.
+    """
+    match = _A1_RE.match(cell_range)
+    if match is None:
+        raise ValueError(f'unsupported A1 range {cell_range}')
+    sheet = match['sheet']
+    if sheet and sheet.startswith("'") and sheet.endswith("'"):
+        sheet = sheet[1:-1].replace("''", "'")
+    start_row, start_column = int(match['r0']) - 1, column_index(match['c0'])
+    end_row = int(match['r1'] or match['r0'])
+    end_column = column_index(match['c1'] or match['c0']) + 1
+    return sheet, start_row, start_column, end_row, end_column
+
+
+def format_range(sheet: str | None, start_row: int, start_column: int, end_row: int, end_column: int) -> str:
+    cell_range = f'{column_letters(start_column)}{start_row + 1}'
+    if (end_row, end_column) != (start_row + 1, start_column + 1):
+        cell_range += f':{column_letters(end_column - 1)}{end_row}'
+    return f'{sheet}!{cell_range}' if sheet else cell_range
+
+
+def pad_grid(cell_range: str, cells: list[list[Any]] | None) -> list[list[Any]]:
+    _, start_row, start_column, end_row, end_column = parse_range(cell_range)
+    width = end_column - start_column
+    cells = cells or []
+    grid = [list(row) + [''] * (width - len(row)) for row in cells[:end_row - start_row]]
+    grid.extend([''] * width for _ in range(end_row - start_row - len(grid)))
+    return grid
 
 
-def get_credentials():
+def get_credentials(token_file: str = 'token.json', secrets_file: str = 'credentials.json'):
     creds = None
-    if os.path.exists("token.json"):
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+    if os.path.exists(token_file):
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
+    if creds and not creds.valid and creds.expired and creds.refresh_token:
+        creds.refresh(Request())
     if not creds or not creds.valid:
-        # if creds and creds.expired and creds.refresh_token:
-        #     creds.refresh(Request())
-        # else:
         flow = InstalledAppFlow.from_client_secrets_file(
-            "credentials.json", SCOPES
+            secrets_file, SCOPES
         )
         creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
+        with open(token_file, "w") as token:
             token.write(creds.to_json())
     return creds
 
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+from typing import Any
+
+from google_sheets import SheetBackend, parse_range
+
+DEFAULT_SHEET = 'Sheet1'
+
+
+class LocalSheetsBackend(SheetBackend):
+    """Sheet backend that keeps spreadsheets in memory, optionally backed by json files.
+
+    With a directory every spreadsheet is stored as `<directory>/<sheet_id>.json`
+    and saved after each write. Values are stored as written, formulas are not
+    evaluated. Ranges without a sheet name refer to `Sheet1`.
+    """
+
+    def __init__(self, directory: str | None = None):
+        self.directory = directory
+        self._spreadsheets: dict[str, dict] = {}
+        self._lock = threading.RLock()
+
+    def _path(self, sheet_id: str) -> str:
+        return os.path.join(self.directory, f'{sheet_id}.json')
+
+    def _load(self, sheet_id: str) -> dict:
+        spreadsheet = self._spreadsheets.get(sheet_id)
+        if spreadsheet is None:
+            spreadsheet = {'sheets': {}, 'conditionalFormats': {}}
+            if self.directory and os.path.exists(self._path(sheet_id)):
+                with open(self._path(sheet_id)) as file:
+                    spreadsheet = json.loads(file.read())
+            self._spreadsheets[sheet_id] = spreadsheet
+        return spreadsheet
+
+    def _save(self, sheet_id: str) -> None:
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(sheet_id), 'w') as file:
+            file.write(json.dumps(self._spreadsheets[sheet_id]))
+
+    def batch_get(self, sheet_id: str, ranges: list[str]) -> list[list[list[Any]]]:
+        with self._lock:
+            spreadsheet = self._load(sheet_id)
+            results = []
+            for cell_range in ranges:
+                sheet, start_row, start_column, end_row, end_column = parse_range(cell_range)
+                grid = spreadsheet['sheets'].get(sheet or DEFAULT_SHEET, [])
+                rows = [list(row[start_column:end_column]) for row in grid[start_row:end_row]]
+                # match the API, which leaves off trailing empty cells and rows
+                for row in rows:
+                    while row and row[-1] == '':
+                        row.pop()
+                while rows and not rows[-1]:
+                    rows.pop()
+                results.append(rows)
+            return results
+
+    def batch_write(self, sheet_id: str, data: list[dict]) -> None:
+        with self._lock:
+            spreadsheet = self._load(sheet_id)
+            for value_range in data:
+                sheet, start_row, start_column, _, _ = parse_range(value_range['range'])
+                grid = spreadsheet['sheets'].setdefault(sheet or DEFAULT_SHEET, [])
+                for i, row in enumerate(value_range['values']):
+                    while len(grid) <= start_row + i:
+                        grid.append([])
+                    grid_row = grid[start_row + i]
+                    if len(grid_row) < start_column + len(row):
+                        grid_row.extend([''] * (start_column + len(row) - len(grid_row)))
+                    grid_row[start_column:start_column + len(row)] = ['' if x is None else x for x in row]
+            self._save(sheet_id)
+
+    def get_conditional_formats(self, sheet_id: str) -> dict[str, list[dict]]:
+        with self._lock:
+            return copy.deepcopy(self._load(sheet_id)['conditionalFormats'])
+
+    def format_cells(self, sheet_id: str, data: dict) -> None:
+        with self._lock:
+            rules = self._load(sheet_id)['conditionalFormats']
+            for request in data['requests']:
+                if 'addConditionalFormatRule' in request:
+                    add = request['addConditionalFormatRule']
+                    gid = str(add['rule']['ranges'][0].get('sheetId', 0))
+                    rules.setdefault(gid, []).insert(add.get('index', len(rules.get(gid, []))), copy.deepcopy(add['rule']))
+                elif 'deleteConditionalFormatRule' in request:
+                    delete = request['deleteConditionalFormatRule']
+                    del rules[str(delete['sheetId'])][delete['index']]
+                else:
+                    raise ValueError(f'unsupported request {next(iter(request))}')
+            self._save(sheet_id)
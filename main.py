@@ -1,14 +1,73 @@
 from __future__ import annotations
 
-from assignments.tier_12.run import run
+import argparse
 
+from assignments.cache import SOLUTION_CACHE_FILE, SolutionCache
+from assignments.tier_11 import run as tier_11
+from assignments.tier_12 import run as tier_12
+from assignments.whatif import format_results, roster_variants, what_if
+from roster import RaidRoster
+from run_config import RUN_CONFIG_FILE, RunConfig, prompt_run_config
 
-if __name__ == "__main__":
+TIERS = {11: tier_11, 12: tier_12}
+BOSSES = {Boss.__name__: Boss for tier in TIERS.values() for Boss in tier.BOSSES}
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Fill in raid assignments from a raid-helper raid plan.')
+    parser.add_argument('--raid-id', type=int, default=1288334217058713712)
+    parser.add_argument('--tier', type=int, choices=sorted(TIERS), default=12)
+    parser.add_argument('--sheet-id', help="the tier's sheet by default")
+    parser.add_argument('--gids', nargs='*', help="the tier's sheets by default")
+    parser.add_argument('--config', default=RUN_CONFIG_FILE, help='run config file, read if it exists')
+    parser.add_argument('--flex-healer', action='append', metavar='NAME[:SPEC]', help='flex healer, in flex order')
+    parser.add_argument('--main-tank', metavar='NAME')
+    parser.add_argument('--boss-option', action='append', metavar='BOSS.OPTION=VALUE')
+    parser.add_argument('--interactive', action='store_true', help='ask for the run config and save it to --config')
+    parser.add_argument('--incremental', action='store_true', help='only repair what signup changes since the last run touched')
+    parser.add_argument('--cache', default=SOLUTION_CACHE_FILE, help='boss solution cache file')
+    parser.add_argument('--no-cache', action='store_true', help='always optimize, ignoring the solution cache')
+    what_if_args = parser.add_argument_group('what-if', 'rank roster variants instead of writing the sheet')
+    what_if_args.add_argument('--what-if', action='store_true')
+    what_if_args.add_argument('--boss', action='append', choices=sorted(BOSSES), help="bosses to rank on, the tier's by default")
+    what_if_args.add_argument('--bench-candidate', action='append', default=[], metavar='NAME')
+    what_if_args.add_argument('--bench', type=int, default=0, metavar='COUNT', help='how many bench candidates sit out')
+    what_if_args.add_argument('--flex-candidate', action='append', default=[], metavar='NAME', help='in flex order')
+    what_if_args.add_argument('--max-flex', type=int, metavar='COUNT')
+    what_if_args.add_argument('--tank-candidate', action='append', default=[], metavar='NAME')
+    what_if_args.add_argument('--keep', type=int, metavar='COUNT', help='only solve the COUNT variants that look best at a glance')
+    what_if_args.add_argument('--top', type=int, default=10, help='how many variants to show')
+    what_if_args.add_argument('--workers', type=int, help='worker processes, all cores by default')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    tier = TIERS[args.tier]
+    config = RunConfig.load(args.config).with_overrides(
+        flex_healers=args.flex_healer,
+        main_tank=args.main_tank,
+        boss_options=args.boss_option,
+    )
+    if args.interactive:
+        config = prompt_run_config(RaidRoster.from_raid_plan(args.raid_id), config)
+        config.save(args.config)
+    cache = None if args.no_cache else SolutionCache(args.cache)
+    if args.what_if:
+        variants = roster_variants(args.bench_candidate, args.bench, args.flex_candidate, args.max_flex, args.tank_candidate)
+        bosses = [BOSSES[name] for name in args.boss] if args.boss else tier.BOSSES
+        results = what_if(
+            RaidRoster.from_raid_plan(args.raid_id), bosses, variants, config,
+            max_workers=args.workers, cache=cache, keep=args.keep,
+        )
+        print(format_results(results, args.top))
+        return
     # run(1285797494751494197)
-    run(
-        1288334217058713712,
-        '1TsJs4OEHpDDELNDQWK2eoy1KIiIPcBWDHQV3JmxS3Dc',
-        ['0', '448537128', '2029521756', '1486593943', '281589537', '409532693', '350226198']
+    tier.run(
+        args.raid_id, args.sheet_id or tier.SHEET_ID, args.gids or tier.GIDS,
+        config=config, incremental=args.incremental, cache=cache,
     )
-    # main()
-    # print(response.json())
\ No newline at end of file
+
+
+if __name__ == "__main__":
+    main()
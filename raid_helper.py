@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RAID_HELPER_URL = os.environ.get('RAID_HELPER_URL', 'https://raid-helper.dev')
+CACHE_DIR = '.raid_helper_cache'
+CACHE_TTL = 60
+
+
+_session: requests.Session | None = None
+
+
+def get_session() -> requests.Session:
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+        _session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return _session
+
+
+class RaidPlanCache:
+    """Raid plans from raid-helper, cached in memory and on disk by raid id.
+
+    A plan younger than `ttl` seconds is returned without touching the
+    network. Older plans are revalidated with their ETag / Last-Modified, so
+    an unchanged plan costs a 304 and no download.
+    """
+
+    def __init__(self, directory: str | None = CACHE_DIR, ttl: float = CACHE_TTL, base_url: str | None = None, session: requests.Session | None = None):
+        self.directory = directory
+        self.ttl = ttl
+        self.base_url = base_url or RAID_HELPER_URL
+        self.session = session
+        self._entries: dict[int, dict] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, raid_id: int) -> str:
+        return os.path.join(self.directory, f'{raid_id}.json')
+
+    def _load(self, raid_id: int) -> dict | None:
+        entry = self._entries.get(raid_id)
+        if entry is None and self.directory and os.path.exists(self._path(raid_id)):
+            with open(self._path(raid_id)) as file:
+                entry = self._entries[raid_id] = json.loads(file.read())
+        return entry
+
+    def _save(self, raid_id: int, entry: dict) -> None:
+        self._entries[raid_id] = entry
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(raid_id), 'w') as file:
+            file.write(json.dumps(entry))
+
+    def get(self, raid_id: int) -> dict:
+        with self._lock:
+            entry = self._load(raid_id)
+        if entry is not None and time.time() - entry['fetched_at'] < self.ttl:
+            return entry['data']
+        headers = {}
+        if entry is not None and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry is not None and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        response = (self.session or get_session()).get(f'{self.base_url}/api/raidplan/{raid_id}', headers=headers, timeout=30)
+        if response.status_code == 304 and entry is not None:
+            entry = dict(entry, fetched_at=time.time())
+        elif response.status_code == 200:
+            entry = {
+                'fetched_at': time.time(),
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'data': response.json(),
+            }
+        else:
+            raise Exception(response.content)
+        with self._lock:
+            self._save(raid_id, entry)
+        return entry['data']
+
+    def invalidate(self, raid_id: int) -> None:
+        with self._lock:
+            self._entries.pop(raid_id, None)
+            if self.directory and os.path.exists(self._path(raid_id)):
+                os.remove(self._path(raid_id))
+
+
+_cache: RaidPlanCache | None = None
+
+
+def fetch_raid_plan(raid_id: int) -> dict:
+    global _cache
+    if _cache is None:
+        _cache = RaidPlanCache()
+    return _cache.get(raid_id)
+
+
+def serve_raid_plans(plans: dict[int, dict], port: int = 0) -> ThreadingHTTPServer:
+    """Start a stand-in for the raid-helper raidplan endpoint on localhost.
+
+    Serves `plans` (mutable, keyed by raid id) with ETag and Last-Modified
+    headers and answers conditional requests with 304. The server runs on a
+    daemon thread; its address is in `server.server_address` and it stops
+    with `server.shutdown()`.
+    """
+    started = email.utils.formatdate(usegmt=True)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            prefix = '/api/raidplan/'
+            raid_id = self.path[len(prefix):]
+            if not self.path.startswith(prefix) or not raid_id.isdigit() or int(raid_id) not in plans:
+                self.send_error(404)
+                return
+            body = json.dumps(plans[int(raid_id)]).encode()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Last-Modified', started)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
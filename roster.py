@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import heapq
 import logging
+from dataclasses import dataclass
 from enum import Enum
-from typing import Generator, Iterator
+from typing import Generator, Iterable, Iterator
 
-import requests
 from PIL import ImageColor
-from pydantic import BaseModel, computed_field
+from pydantic import BaseModel, Field, TypeAdapter
 
-from google_sheets import SHEET_ID, format_cells
+from google_sheets import SHEET_ID, sync_conditional_formats
+from raid_helper import fetch_raid_plan
+from run_config import RunConfig
 
 LOGGER = logging.getLogger(__name__)
 
@@ -17,6 +20,10 @@ class RaiderUnavailable(BaseException):
     pass
 
 
+class UnknownSpec(ValueError):
+    pass
+
+
 class Role(Enum):
     TANKS = 'tanks'
     MELEE = 'melee'
@@ -38,78 +45,194 @@ class WowClass(Enum):
 
 
 class RaidRoster(BaseModel):
+    """The raiders signed up for a raid.
+
+    Raiders are indexed by name, role, class, spec and class_and_spec when the
+    roster is built and as they are added, so queries only walk the raiders
+    that can match. Index entries are roster positions, which keeps results in
+    roster order and lets several indexes be merged.
+
+    Which raiders already have a position is kept in a byte per roster
+    position rather than on the raiders. `overlay()` gives each boss its own
+    copy of those flags over the same raiders and indexes, and `snapshot()` /
+    `restore()` let a solver undo placements.
+    """
     raiders: list[Raider]
+    _by_name: dict[str, int]
+    _by_role: dict[Role, list[int]]
+    _by_class: dict[str, list[int]]
+    _by_spec: dict[str, list[int]]
+    _by_class_and_spec: dict[str, list[int]]
+    _flex_healers: list[int]
+    _ids: dict[int, int]
+    _taken: bytearray
+    _cooldowns: list[RaidCooldown]
+
+    class Config:
+        arbitrary_types_allowed = True
 
     def __iter__(self) -> Iterator[Raider]:
         return self.raiders.__iter__()
 
     def model_post_init(self, __context):
-        print('do you have flex healers? (y/n)')
-        user_input = input()
-        if user_input == 'y':
-            potential_healers = [x for x in self.get_potential_flex_healers()]
-            print('which raiders are flex healers? (csv, ex. 1,3,5). Order by who will flex first.')
-            for i, healer in enumerate(potential_healers):
-                print(i, healer.name)
-            user_input = input()
-            for i, idx in enumerate(user_input.split(',')):
-                raider: Raider = potential_healers[int(idx)]
-                raider.flex_healer = i
-                print(f'what is {raider.name}\'s flex spec?')
-                raider.flex_spec = input()
+        self._build_indexes()
         self.set_main_tank()
 
+    def _build_indexes(self) -> None:
+        self._by_name = {}
+        self._by_role = {}
+        self._by_class = {}
+        self._by_spec = {}
+        self._by_class_and_spec = {}
+        self._flex_healers = []
+        self._ids = {}
+        self._taken = bytearray()
+        self._cooldowns = []
+        for i in range(len(self.raiders)):
+            self._index_raider(i)
+
+    def _index_raider(self, i: int) -> None:
+        raider = self.raiders[i]
+        self._by_name.setdefault(raider.name, i)
+        self._by_role.setdefault(raider.role, []).append(i)
+        self._by_class.setdefault(raider.wow_class, []).append(i)
+        self._by_spec.setdefault(raider.spec, []).append(i)
+        self._by_class_and_spec.setdefault(raider.class_and_spec, []).append(i)
+        if raider.flex_healer is not None and raider.role != Role.HEALERS:
+            self._flex_healers.append(i)
+        self._ids[id(raider)] = i
+        self._taken.append(0)
+        if raider.class_and_spec in RAID_COOLDOWNS:
+            self._cooldowns.append(RaidCooldown(raider, *RAID_COOLDOWNS[raider.class_and_spec]))
+
+    def overlay(self) -> RaidRoster:
+        """A view of this roster with no positions set, sharing its raiders and indexes."""
+        roster = self.model_copy()
+        roster._taken = bytearray(len(self.raiders))
+        return roster
+
+    def _position(self, raider: Raider) -> int:
+        i = self._ids.get(id(raider))
+        if i is None or self.raiders[i] is not raider:
+            # the roster was deep copied, the ids belong to the original raiders
+            self._ids = {id(x): i for i, x in enumerate(self.raiders)}
+            i = self._ids[id(raider)]
+        return i
+
+    def is_set(self, raider: Raider) -> bool:
+        return bool(self._taken[self._position(raider)])
+
+    def set_position(self, raider: Raider, value: bool = True) -> None:
+        self._taken[self._position(raider)] = value
+
+    def reset_positions(self) -> None:
+        self._taken[:] = bytes(len(self.raiders))
+
+    def snapshot(self) -> bytes:
+        return bytes(self._taken)
+
+    def restore(self, snapshot: bytes) -> None:
+        self._taken[:] = snapshot
+
+    @classmethod
+    def from_raid_plan(cls, raid_id: int, config: RunConfig | None = None) -> RaidRoster:
+        raiders, errors = parse_raid_drop(fetch_raid_plan(raid_id)['raidDrop'])
+        for error in errors:
+            LOGGER.warning(f'skipping {error}')
+        roster = cls(raiders=raiders)
+        if config is not None:
+            roster.configure(config)
+        return roster
+
+    def to_rows(self) -> list[tuple]:
+        return [raider.to_row() for raider in self.raiders]
+
     @classmethod
-    def from_raid_plan(cls, raid_id: int) -> RaidRoster:
-        response = requests.get(f'https://raid-helper.dev/api/raidplan/{raid_id}')
-        if response.status_code != 200:
-            raise Exception(response.content)
-        return cls(raiders=[Raider.from_raid_plan_data(x) for x in response.json()['raidDrop'] if x['name'] is not None])
+    def from_rows(cls, rows: list[tuple], config: RunConfig | None = None) -> RaidRoster:
+        roster = cls(raiders=[Raider.from_row(row) for row in rows])
+        if config is not None:
+            roster.configure(config)
+        return roster
+
+    def configure(self, config: RunConfig) -> None:
+        """Set flex healers, their specs and the main tank from a run config."""
+        for raider in self.raiders:
+            raider.flex_healer = None
+            raider.flex_spec = None
+        for i, name in enumerate(config.flex_healers):
+            raider = self.get_raider_by_name(name)
+            if raider is None:
+                LOGGER.warning(f'flex healer {name} is not in the roster')
+                continue
+            raider.flex_healer = i
+            raider.flex_spec = config.flex_specs.get(name)
+        self._flex_healers = [i for i, x in enumerate(self.raiders) if x.flex_healer is not None and x.role != Role.HEALERS]
+        self.set_main_tank(config.main_tank)
 
     def add_raider(self, raider: Raider) -> None:
         self.raiders.append(raider)
+        self._index_raider(len(self.raiders) - 1)
+
+    def _lookup(self, index: dict, keys: Iterable) -> Iterator[int]:
+        return heapq.merge(*(index.get(key, ()) for key in dict.fromkeys(keys)))
+
+    def _positions(self, role: Role | None = None) -> Iterable[int]:
+        if role:
+            return self._by_role.get(role, ())
+        return range(len(self.raiders))
+
+    def _healer_positions(self, flex: int = 0) -> Iterable[int]:
+        healers = self._by_role.get(Role.HEALERS, ())
+        if not flex:
+            return healers
+        flex_healers = [i for i in self._flex_healers if self.raiders[i].flex_healer < flex]
+        return heapq.merge(healers, flex_healers) if flex_healers else healers
 
     def get_healers(self, flex: int = 0) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.role == Role.HEALERS:
-                yield raider
-            elif raider.flex_healer is not None and raider.flex_healer < flex:
-                yield raider
+        for i in self._healer_positions(flex=flex):
+            yield self.raiders[i]
 
     def get_healer(self, preferred: list[str] | None = None, last: list[str] | None = None, flex: int = 0, available: bool = True) -> Raider:
         if preferred:
-            for raider in self.get_healers(flex=flex):
-                if raider.class_and_spec in preferred:
-                    if available and raider.position_set:
-                        continue
-                    return raider
+            for i in self._lookup(self._by_class_and_spec, preferred):
+                raider = self.raiders[i]
+                if raider.role != Role.HEALERS and (raider.flex_healer is None or raider.flex_healer >= flex):
+                    continue
+                if available and self._taken[i]:
+                    continue
+                return raider
         if last:
-            for raider in self.get_healers(flex=flex):
+            for i in self._healer_positions(flex=flex):
+                raider = self.raiders[i]
                 if raider.class_and_spec not in last:
-                    if available and raider.position_set:
+                    if available and self._taken[i]:
                         continue
                     return raider
-        for raider in self.get_healers(flex=flex):
-            if available and raider.position_set:
+        for i in self._healer_positions(flex=flex):
+            if available and self._taken[i]:
                 continue
-            return raider
+            return self.raiders[i]
         raise RaiderUnavailable()
 
-    def get_tank_healer(self):
-        return self.get_healer(preferred=['restoration shaman', 'holy paladin'], last=['restoration druid', 'discipline priest'])
+    def get_tank_healer(self, flex: int = 0):
+        return self.get_healer(preferred=['restoration shaman', 'holy paladin'], last=['restoration druid', 'discipline priest'], flex=flex)
 
     def get_raider_by_name(self, name: str) -> Raider:
-        return next((x for x in self.raiders if x.name == name), None)
+        i = self._by_name.get(name)
+        return self.raiders[i] if i is not None else None
 
     def get_tanks(self, flex: int = 0) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.role == Role.TANKS:
-                yield raider
+        for i in self._by_role.get(Role.TANKS, ()):
+            yield self.raiders[i]
 
-    def set_main_tank(self):
+    def set_main_tank(self, name: str | None = None):
         for raider in self.get_tanks():
             raider.main_tank = False
-        raider = self.get_tank(preferred=['blood death knight'], last=['guardian druid'], available=False)
+        raider = self.get_raider_by_name(name) if name else None
+        if name and raider is None:
+            LOGGER.warning(f'main tank {name} is not in the roster')
+        if raider is None:
+            raider = self.get_tank(preferred=['blood death knight'], last=['guardian druid'], available=False)
         raider.main_tank = True
 
     def get_tank(self, preferred: list[str] | None = None, last: list[str] | None = None, flex: int = 0, available: bool = True, main_tank: bool = False) -> Raider:
@@ -120,88 +243,83 @@ class RaidRoster(BaseModel):
             self.set_main_tank()
             return self.get_tank(main_tank=True)
         if preferred:
-            for raider in self.get_tanks(flex=flex):
-                if raider.class_and_spec in preferred:
-                    if raider.main_tank or available and raider.position_set:
-                        continue
-                    return raider
+            for i in self._lookup(self._by_class_and_spec, preferred):
+                raider = self.raiders[i]
+                if raider.role != Role.TANKS or raider.main_tank or available and self._taken[i]:
+                    continue
+                return raider
         if last:
-            for raider in self.get_tanks(flex=flex):
+            for i in self._by_role.get(Role.TANKS, ()):
+                raider = self.raiders[i]
                 if raider.class_and_spec not in last:
-                    if raider.main_tank or available and raider.position_set:
+                    if raider.main_tank or available and self._taken[i]:
                         continue
                     return raider
-        for raider in self.get_tanks(flex=flex):
-            if raider.main_tank or available and raider.position_set:
+        for i in self._by_role.get(Role.TANKS, ()):
+            raider = self.raiders[i]
+            if raider.main_tank or available and self._taken[i]:
                 continue
             return raider
         raise RaiderUnavailable()
 
     def get_raider(self, role: Role = None, preferred: list[str] = None, last: list[str] = None, available: bool = True, strict: bool = False ) -> Raider:
         if preferred:
-            for raider in self.raiders:
+            for i in self._lookup(self._by_class_and_spec, preferred):
+                raider = self.raiders[i]
                 if role and raider.role != role:
                     continue
-                if preferred and raider.class_and_spec in preferred:
-                    if available and raider.position_set:
-                        continue
-                    return raider
+                if available and self._taken[i]:
+                    continue
+                return raider
             if strict:
                 raise RaiderUnavailable()
         if last:
-            for raider in self.raiders:
-                if role and raider.role != role:
-                    continue
+            for i in self._positions(role):
+                raider = self.raiders[i]
                 if raider.class_and_spec not in last:
-                    if available and raider.position_set:
+                    if available and self._taken[i]:
                         continue
                     return raider
-        for raider in self.raiders:
-            if role and raider.role != role:
-                continue
-            if available and raider.position_set:
+        for i in self._positions(role):
+            raider = self.raiders[i]
+            if available and self._taken[i]:
                 continue
             return raider
 
     def get_raiders(self, role: Role = None, preferred: list[str] = None, last: list[str] = None, available: bool = True, strict: bool = False ) -> Generator[Raider]:
         if preferred:
-            for raider in self.raiders:
+            for i in self._lookup(self._by_class_and_spec, preferred):
+                raider = self.raiders[i]
                 if role and raider.role != role:
                     continue
-                if preferred and raider.class_and_spec in preferred:
-                    if available and raider.position_set:
-                        continue
-                    yield raider
+                if available and self._taken[i]:
+                    continue
+                yield raider
         if not strict:
             if last:
-                for raider in self.raiders:
-                    if role and raider.role != role:
-                        continue
+                for i in self._positions(role):
+                    raider = self.raiders[i]
                     if raider.class_and_spec not in last:
-                        if available and raider.position_set:
+                        if available and self._taken[i]:
                             continue
                         yield raider
-            for raider in self.raiders:
-                if role and raider.role != role:
-                    continue
-                if available and raider.position_set:
+            for i in self._positions(role):
+                raider = self.raiders[i]
+                if available and self._taken[i]:
                     continue
                 yield raider
 
     def get_enhancement_shamans(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.spec == 'enhancement':
-                yield raider
+        for i in self._by_spec.get('enhancement', ()):
+            yield self.raiders[i]
 
     def get_elemental_shamans(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.spec == 'elemental':
-                yield raider
+        for i in self._by_spec.get('elemental', ()):
+            yield self.raiders[i]
 
     def get_death_knights(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.wow_class == WowClass.DEATH_KNIGHT.value:
-                yield raider
+        for i in self._by_class.get(WowClass.DEATH_KNIGHT.value, ()):
+            yield self.raiders[i]
 
     def get_death_knight(self, role: Role = None, preferred: list[str] = None) -> Raider:
         for raider in self.get_death_knights():
@@ -210,24 +328,20 @@ class RaidRoster(BaseModel):
         raise RaiderUnavailable()
 
     def get_rogues(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.wow_class == WowClass.ROGUE.value:
-                yield raider
+        for i in self._by_class.get(WowClass.ROGUE.value, ()):
+            yield self.raiders[i]
 
     def get_warlocks(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.wow_class == WowClass.WARLOCK.value:
-                yield raider
+        for i in self._by_class.get(WowClass.WARLOCK.value, ()):
+            yield self.raiders[i]
 
     def get_melee(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.role == Role.MELEE:
-                yield raider
+        for i in self._by_role.get(Role.MELEE, ()):
+            yield self.raiders[i]
 
     def get_ranged(self) -> Generator[Raider]:
-        for raider in self.raiders:
-            if raider.role == Role.RANGED:
-                yield raider
+        for i in self._by_role.get(Role.RANGED, ()):
+            yield self.raiders[i]
 
     def get_potential_flex_healers(self):
         for raider in self.get_melee():
@@ -237,256 +351,255 @@ class RaidRoster(BaseModel):
             if raider.wow_class in [WowClass.SHAMAN.value, WowClass.PRIEST.value, WowClass.DRUID.value]:
                 yield raider
 
+    def raid_cooldowns(self, preferred: list[str] | None = None, available: bool = False) -> list[RaidCooldown]:
+        """The raid cooldowns on the roster in roster order, optionally only those of the `preferred` specs."""
+        return [
+            x for x in self._cooldowns
+            if (preferred is None or x.raider.class_and_spec in preferred) and not (available and self.is_set(x.raider))
+        ]
+
     def get_raid_cooldowns(self, can_stack: bool = True, burst: bool = True) -> Generator[tuple[Raider]]:
         if can_stack:
             preferred = ['restoration shaman', 'discipline priest']
             if burst:
                 preferred.append('unholy death knight')
-            for raider in self.get_raiders(preferred=preferred, strict=True, available=False):
-                yield raider,
+            for cooldown in self.raid_cooldowns(preferred):
+                yield cooldown.raider,
         else:
-            cds = list(self.get_raiders(preferred=['restoration shaman', 'discipline priest'], strict=True, available=False))
+            cds = [x.raider for x in self.raid_cooldowns(['restoration shaman', 'discipline priest'])]
             if burst:
-                dk_cds = list(self.get_raiders(preferred=['unholy death knight'], strict=True, available=False))
+                dk_cds = [x.raider for x in self.raid_cooldowns(['unholy death knight'])]
                 for raider1, raider2 in zip(dk_cds, cds):
                     yield raider1, raider2
-                if len(cds) > len(dk_cds):
-                    cds = cds[len(dk_cds):]
-                else:
-                    cds = []
+                cds = cds[len(dk_cds):]
             icds = iter(cds)
-            try:
-                for cd1, cd2 in zip(icds):
-                    yield cd1, cd2
-            except ValueError:
-                pass
-        for raider1, raider2 in zip(self.get_raiders(preferred=['holy paladin'], strict=True), self.get_raiders(preferred=['arms warrior', 'fury warrior', 'protection warrior'], strict=True, available=False)):
+            for cd1, cd2 in zip(icds, icds):
+                yield cd1, cd2
+        paladins = [x.raider for x in self.raid_cooldowns(['holy paladin'], available=True)]
+        warriors = [x.raider for x in self.raid_cooldowns(['arms warrior', 'fury warrior', 'protection warrior'])]
+        for raider1, raider2 in zip(paladins, warriors):
             yield raider1, raider2
 
     def conditional_format(self, sheet_id: str, gids: list[str]) -> None:
-        data = {'requests': []}
-        for i, raider in enumerate(self.raiders):
-            red, green, blue = (x/255 for x in ImageColor.getrgb(raider.color))
-            data['requests'].extend([
-                {
-                    'addConditionalFormatRule': {
-                        'rule': {
-                            'ranges': [
-                                {
-                                    'sheetId': x,
-                                    'startRowIndex': 0,
-                                    'endRowIndex': 300,
-                                    'startColumnIndex': 0,
-                                    'endColumnIndex': 200,
-                                }
-                            ],
-                            'booleanRule': {
-                                'condition': {
-                                    'type': 'TEXT_EQ',
-                                    'values': [{'userEnteredValue': raider.name}]
-                                },
-                                'format': {
-                                    'backgroundColor': {
-                                        'green': green,
-                                        'red': red,
-                                        'blue': blue,
-                                    }
-                                }
-                            }
+        """Colour every raider's name on the given sheets.
+
+        Raiders that share a colour share one rule per sheet, and only rules
+        that changed since the last run are sent.
+        """
+        names_by_color: dict[str, list[str]] = {}
+        for raider in self.raiders:
+            names_by_color.setdefault(raider.color, []).append(raider.name)
+        rules = {}
+        for gid in gids:
+            rules[gid] = []
+            for color, names in names_by_color.items():
+                red, green, blue = (x/255 for x in ImageColor.getrgb(color))
+                formula = ','.join('A1="{}"'.format(name.replace('"', '""')) for name in names)
+                rules[gid].append({
+                    # a rule's ranges all have to be on the same sheet
+                    'ranges': [
+                        {
+                            'sheetId': int(gid),
+                            'startRowIndex': 0,
+                            'endRowIndex': 300,
+                            'startColumnIndex': 0,
+                            'endColumnIndex': 200,
+                        }
+                    ],
+                    'booleanRule': {
+                        'condition': {
+                            'type': 'CUSTOM_FORMULA',
+                            'values': [{'userEnteredValue': f'=OR({formula})'}]
                         },
-                        'index': i,
+                        'format': {
+                            'backgroundColor': {
+                                'green': green,
+                                'red': red,
+                                'blue': blue,
+                            }
+                        }
                     }
-                }
-            ] for x in gids)
-            # ] for x in ['1211611579', '278294734', '44485663'])
-        format_cells(sheet_id, data)
+                })
+        sync_conditional_formats(sheet_id, rules)
 
 
-class Raider(BaseModel):
-    party: int
-    slot: int
+class RaidPlanSignup(BaseModel):
+    """One entry of a raid-helper raid plan's `raidDrop`, only used to validate the json."""
+    party: int = Field(alias='partyId')
+    slot: int = Field(alias='slotId')
     name: str
-    discord_id: int | str | None
-    wow_class: str
+    discord_id: int | str | None = Field(default=None, alias='userid')
     spec: str
     spec_emote: str
-    role: Role
     color: str
-    position_set: bool = False
-    flex_healer: int | None = None
-    flex_spec: str | None = None
-    main_tank: bool = False
 
-    @computed_field
-    def class_and_spec(self) -> str:
-        return f'{self.spec} {self.wow_class}'
+
+class Raider:
+    """A raider on the roster.
+
+    A plain slotted object so the roster and solvers can read it cheaply,
+    with `class_and_spec` built once.
+    """
+    __slots__ = (
+        'party', 'slot', 'name', 'discord_id', 'wow_class', 'spec', 'spec_emote', 'role', 'color',
+        'flex_healer', 'flex_spec', 'main_tank', 'class_and_spec',
+    )
+
+    def __init__(
+        self,
+        party: int,
+        slot: int,
+        name: str,
+        discord_id: int | str | None,
+        wow_class: WowClass | str,
+        spec: str,
+        spec_emote: str,
+        role: Role | str,
+        color: str,
+        flex_healer: int | None = None,
+        flex_spec: str | None = None,
+        main_tank: bool = False,
+    ):
+        wow_class = WowClass(wow_class)
+        role = Role(role)
+        self.party = party
+        self.slot = slot
+        self.name = name
+        self.discord_id = discord_id
+        self.wow_class = wow_class.value
+        self.spec = spec
+        self.spec_emote = spec_emote
+        self.role = role
+        self.color = color
+        self.flex_healer = flex_healer
+        self.flex_spec = flex_spec
+        self.main_tank = main_tank
+        self.class_and_spec = f'{spec} {wow_class.value}'
+
+    def __repr__(self) -> str:
+        return f'Raider(name={self.name!r}, class_and_spec={self.class_and_spec!r}, role={self.role.value!r})'
 
     @classmethod
     def from_raid_plan_data(cls, data: dict) -> Raider:
-        role, wow_class, spec = get_spec_info(data['spec'])
-        print()
+        return cls.from_signup(RaidPlanSignup.model_validate(data))
+
+    @classmethod
+    def from_signup(cls, signup: RaidPlanSignup) -> Raider:
+        role, wow_class, spec = get_spec_info(signup.spec)
         return cls(
-            party=data['partyId'],
-            slot=data['slotId'],
-            name=data['name'],
-            discord_id=data.get('userid'),
+            party=signup.party,
+            slot=signup.slot,
+            name=signup.name,
+            discord_id=signup.discord_id,
             wow_class=wow_class,
             spec=spec,
             role=role,
-            color=data['color'],
-            spec_emote=data['spec_emote'],
+            color=signup.color,
+            spec_emote=signup.spec_emote,
         )
 
-    @computed_field()
+    def to_row(self) -> tuple:
+        """The signup as a plain tuple, cheap to send to another process; `from_row` reverses it."""
+        return (self.party, self.slot, self.name, self.discord_id, self.wow_class, self.spec, self.spec_emote, self.role.value, self.color)
+
+    @classmethod
+    def from_row(cls, row: tuple) -> Raider:
+        return cls(*row)
+
+    @property
     def spec_link(self) -> str:
         return f'https://cdn.discordapp.com/emojis/{self.spec_emote}.png'
 
+
+@dataclass(frozen=True, slots=True)
+class RaidCooldown:
+    """A raid cooldown and the raider who has it. Times are in seconds.
+
+    `stacks` is whether two casts of the spell at once both count.
+    """
+    raider: Raider
+    spell: str
+    cooldown: int
+    duration: int
+    stacks: bool
+
+
+_SIGNUPS = TypeAdapter(list[RaidPlanSignup])
+
+
+def parse_raid_drop(raid_drop: list[dict]) -> tuple[list[Raider], list[UnknownSpec]]:
+    """Turn a raid plan's `raidDrop` into raiders, validating every signup in one pass.
+
+    Empty slots are skipped. Signups with a spec that isn't in SPEC_INFO are
+    left out and returned as errors.
+    """
+    raiders = []
+    errors = []
+    for signup in _SIGNUPS.validate_python([x for x in raid_drop if x.get('name') is not None]):
+        try:
+            raiders.append(Raider.from_signup(signup))
+        except UnknownSpec as e:
+            errors.append(UnknownSpec(f'{signup.name} has unknown spec {e}'))
+    return raiders, errors
+
+
 def get_raid_plan(raid_number: int) -> list[Raider]:
-    response = requests.get(f'https://raid-helper.dev/api/raidplan/{raid_number}')
-    return [Raider.from_raid_plan(x) for x in response.json()['raidDrop'] if x['name'] is not None]
+    return parse_raid_drop(fetch_raid_plan(raid_number)['raidDrop'])[0]
+
+
+# raid-helper spec keys, the 1 suffix tells apart specs with the same name on another class
+SPEC_INFO: dict[str, tuple[Role, WowClass, str]] = {
+    'Protection': (Role.TANKS, WowClass.WARRIOR, 'protection'),
+    'Protection1': (Role.TANKS, WowClass.PALADIN, 'protection'),
+    'Guardian': (Role.TANKS, WowClass.DRUID, 'guardian'),
+    'Blood_Tank': (Role.TANKS, WowClass.DEATH_KNIGHT, 'blood'),
+    'Frost_Tank': (Role.TANKS, WowClass.DEATH_KNIGHT, 'frost'),
+    'Unholy_Tank': (Role.TANKS, WowClass.DEATH_KNIGHT, 'unholy'),
+    'Blood_DPS': (Role.MELEE, WowClass.DEATH_KNIGHT, 'blood'),
+    'Frost_DPS': (Role.MELEE, WowClass.DEATH_KNIGHT, 'frost'),
+    'Unholy_DPS': (Role.MELEE, WowClass.DEATH_KNIGHT, 'unholy'),
+    'Arms': (Role.MELEE, WowClass.WARRIOR, 'arms'),
+    'Fury': (Role.MELEE, WowClass.WARRIOR, 'fury'),
+    'Balance': (Role.RANGED, WowClass.DRUID, 'balance'),
+    'Feral': (Role.MELEE, WowClass.DRUID, 'feral'),
+    'Restoration': (Role.HEALERS, WowClass.DRUID, 'restoration'),
+    'Holy1': (Role.HEALERS, WowClass.PALADIN, 'holy'),
+    'Retribution': (Role.MELEE, WowClass.PALADIN, 'retribution'),
+    'Assassination': (Role.MELEE, WowClass.ROGUE, 'assassination'),
+    'Combat': (Role.MELEE, WowClass.ROGUE, 'combat'),
+    'Subtlety': (Role.MELEE, WowClass.ROGUE, 'subtlety'),
+    'Beastmastery': (Role.RANGED, WowClass.HUNTER, 'beast mastery'),
+    'Marksmanship': (Role.RANGED, WowClass.HUNTER, 'marksmanship'),
+    'Survival': (Role.RANGED, WowClass.HUNTER, 'survival'),
+    'Frost': (Role.RANGED, WowClass.MAGE, 'frost'),
+    'Fire': (Role.RANGED, WowClass.MAGE, 'fire'),
+    'Arcane': (Role.RANGED, WowClass.MAGE, 'arcane'),
+    'Affliction': (Role.RANGED, WowClass.WARLOCK, 'affliction'),
+    'Demonology': (Role.RANGED, WowClass.WARLOCK, 'demonology'),
+    'Destruction': (Role.RANGED, WowClass.WARLOCK, 'destruction'),
+    'Discipline': (Role.HEALERS, WowClass.PRIEST, 'discipline'),
+    'Holy': (Role.HEALERS, WowClass.PRIEST, 'holy'),
+    'Shadow': (Role.RANGED, WowClass.PRIEST, 'shadow'),
+    'Elemental': (Role.RANGED, WowClass.SHAMAN, 'elemental'),
+    'Restoration1': (Role.HEALERS, WowClass.SHAMAN, 'restoration'),
+    'Enhancement': (Role.MELEE, WowClass.SHAMAN, 'enhancement'),
+}
+
+
+# class_and_spec: spell, cooldown, duration, stacks
+RAID_COOLDOWNS: dict[str, tuple[str, int, int, bool]] = {
+    'restoration shaman': ('Spirit Link Totem', 180, 6, True),
+    'discipline priest': ('Power Word: Barrier', 180, 10, False),
+    'unholy death knight': ('Anti-Magic Zone', 120, 10, False),
+    'holy paladin': ('Aura Mastery', 120, 6, False),
+    'arms warrior': ('Rallying Cry', 180, 10, False),
+    'fury warrior': ('Rallying Cry', 180, 10, False),
+    'protection warrior': ('Rallying Cry', 180, 10, False),
+}
 
 
 def get_spec_info(spec: str) -> (Role, WowClass, str):
-    match spec:
-        case 'Protection':
-            role = Role.TANKS
-            wow_class = WowClass.WARRIOR
-            spec = 'protection'
-        case 'Protection1':
-            role = Role.TANKS
-            wow_class = WowClass.PALADIN
-            spec = 'protection'
-        case 'Guardian':
-            role = Role.TANKS
-            wow_class = WowClass.DRUID
-            spec = 'guardian'
-        case 'Blood_Tank':
-            role = Role.TANKS
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'blood'
-        case 'Frost_Tank':
-            role = Role.TANKS
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'frost'
-        case 'Unholy_Tank':
-            role = Role.TANKS
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'unholy'
-        case 'Blood_DPS':
-            role = Role.MELEE
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'blood'
-        case 'Frost_DPS':
-            role = Role.MELEE
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'frost'
-        case 'Unholy_DPS':
-            role = Role.MELEE
-            wow_class = WowClass.DEATH_KNIGHT
-            spec = 'unholy'
-        case 'Arms':
-            role = Role.MELEE
-            wow_class = WowClass.WARRIOR
-            spec = 'arms'
-        case 'Fury':
-            role = Role.MELEE
-            wow_class = WowClass.WARRIOR
-            spec = 'fury'
-        case 'Balance':
-            role = Role.RANGED
-            wow_class = WowClass.DRUID
-            spec = 'balance'
-        case 'Feral':
-            role = Role.MELEE
-            wow_class = WowClass.DRUID
-            spec = 'feral'
-        case 'Restoration':
-            role = Role.HEALERS
-            wow_class = WowClass.DRUID
-            spec = 'restoration'
-        case 'Holy1':
-            role = Role.HEALERS
-            wow_class = WowClass.PALADIN
-            spec = 'restoration'
-        case 'Retribution':
-            role = Role.MELEE
-            wow_class = WowClass.PALADIN
-            spec = 'retribution'
-        case 'Assassination':
-            role = Role.MELEE
-            wow_class = WowClass.ROGUE
-            spec = 'assassination'
-        case 'Combat':
-            role = Role.MELEE
-            wow_class = WowClass.ROGUE
-            spec = 'combat'
-        case 'Subtlety':
-            role = Role.MELEE
-            wow_class = WowClass.ROGUE
-            spec = 'subtlety'
-        case 'Beastmastery':
-            role = Role.RANGED
-            wow_class = WowClass.HUNTER
-            spec = 'beast mastery'
-        case 'Marksmanship':
-            role = Role.RANGED
-            wow_class = WowClass.HUNTER
-            spec = 'marksmanship'
-        case 'Survival':
-            role = Role.RANGED
-            wow_class = WowClass.HUNTER
-            spec = 'survival'
-        case 'Frost':
-            role = Role.RANGED
-            wow_class = WowClass.MAGE
-            spec = 'frost'
-        case 'Fire':
-            role = Role.RANGED
-            wow_class = WowClass.MAGE
-            spec = 'fire'
-        case 'Arcane':
-            role = Role.RANGED
-            wow_class = WowClass.MAGE
-            spec = 'arcane'
-        case 'Affliction':
-            role = Role.RANGED
-            wow_class = WowClass.WARLOCK
-            spec = 'affliction'
-        case 'Demonology':
-            role = Role.RANGED
-            wow_class = WowClass.WARLOCK
-            spec = 'demonology'
-        case 'Destruction':
-            role = Role.RANGED
-            wow_class = WowClass.WARLOCK
-            spec = 'destruction'
-        case 'Discipline':
-            role = Role.HEALERS
-            wow_class = WowClass.PRIEST
-            spec = 'discipline'
-        case 'Holy':
-            role = Role.HEALERS
-            wow_class = WowClass.PRIEST
-            spec = 'holy'
-        case 'Shadow':
-            role = Role.RANGED
-            wow_class = WowClass.PRIEST
-            spec = 'shadow'
-        case 'Elemental':
-            role = Role.RANGED
-            wow_class = WowClass.SHAMAN
-            spec = 'elemental'
-        case 'Restoration1':
-            role = Role.HEALERS
-            wow_class = WowClass.SHAMAN
-            spec = 'restoration'
-        case 'Enhancement':
-            role = Role.MELEE
-            wow_class = WowClass.SHAMAN
-            spec = 'enhancement'
-        case _:
-            LOGGER.warning(f'we did not find info for this role {spec}')
-            role = Role.TANKS
-            wow_class = WowClass.PRIEST
-            spec = 'unknown'
-    return role, wow_class, spec
+    try:
+        return SPEC_INFO[spec]
+    except KeyError:
+        raise UnknownSpec(spec) from None
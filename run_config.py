@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+if TYPE_CHECKING:
+    from roster import RaidRoster
+
+RUN_CONFIG_FILE = 'run_config.json'
+
+
+class RunConfig(BaseModel):
+    """Everything about a run that used to be asked on stdin.
+
+    `flex_healers` is in flex order, the first name flexes first.
+    `bosses` holds keyword options per boss, keyed by the lower case class
+    name, e.g. {'alakir': {'flex_healers': 2}}.
+    """
+    flex_healers: list[str] = []
+    flex_specs: dict[str, str] = {}
+    main_tank: str | None = None
+    bosses: dict[str, dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, path: str = RUN_CONFIG_FILE) -> RunConfig:
+        if not os.path.exists(path):
+            return cls()
+        with open(path) as file:
+            return cls.model_validate_json(file.read())
+
+    def save(self, path: str = RUN_CONFIG_FILE) -> None:
+        with open(path, 'w') as file:
+            file.write(self.model_dump_json(indent=2))
+
+    def boss_options(self, boss: type | str) -> dict[str, Any]:
+        name = boss if isinstance(boss, str) else boss.__name__
+        return self.bosses.get(name.lower(), {})
+
+    def with_overrides(self, flex_healers: list[str] | None = None, main_tank: str | None = None, boss_options: list[str] | None = None) -> RunConfig:
+        """Apply command line flags on top of this config.
+
+        Flex healers are `NAME` or `NAME:SPEC`, boss options `BOSS.OPTION=VALUE`
+        with the value parsed as json when possible.
+        """
+        config = self.model_copy(deep=True)
+        if flex_healers:
+            config.flex_healers = []
+            for flex_healer in flex_healers:
+                name, _, spec = flex_healer.partition(':')
+                config.flex_healers.append(name)
+                if spec:
+                    config.flex_specs[name] = spec
+        if main_tank:
+            config.main_tank = main_tank
+        for boss_option in boss_options or []:
+            key, _, value = boss_option.partition('=')
+            boss, _, option = key.partition('.')
+            try:
+                value = json.loads(value)
+            except json.JSONDecodeError:
+                pass
+            config.bosses.setdefault(boss.lower(), {})[option] = value
+        return config
+
+
+def prompt_run_config(roster: RaidRoster, config: RunConfig | None = None) -> RunConfig:
+    """Ask the questions the roster and Al'Akir used to ask and return the answers as a config."""
+    config = (config or RunConfig()).model_copy(deep=True)
+    print('do you have flex healers? (y/n)')
+    user_input = input()
+    if user_input == 'y':
+        potential_healers = [x for x in roster.get_potential_flex_healers()]
+        print('which raiders are flex healers? (csv, ex. 1,3,5). Order by who will flex first.')
+        for i, healer in enumerate(potential_healers):
+            print(i, healer.name)
+        user_input = input()
+        config.flex_healers = []
+        for idx in user_input.split(','):
+            raider = potential_healers[int(idx)]
+            config.flex_healers.append(raider.name)
+            print(f'what is {raider.name}\'s flex spec?')
+            config.flex_specs[raider.name] = input()
+    print('do you want to flex healers for Al\'Akir? (y/n)')
+    user_input = input()
+    if user_input == 'y':
+        print('how many healers do you want to flex?')
+        config.bosses.setdefault('alakir', {})['flex_healers'] = int(input())
+    else:
+        config.bosses.setdefault('alakir', {})['flex_healers'] = 0
+    return config
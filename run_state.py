@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+
+from pydantic import BaseModel
+
+from roster import RaidRoster, Raider
+from run_config import RunConfig
+
+RUN_STATE_FILE = 'run_state.json'
+
+
+@dataclass
+class RosterDiff:
+    """Raiders who signed up, dropped, changed class, spec or role, or changed colour since the last run, by name."""
+    added: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+    changed: set[str] = field(default_factory=set)
+    recolored: set[str] = field(default_factory=set)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed or self.recolored)
+
+    @property
+    def released(self) -> set[str]:
+        """Raiders whose places on the sheet no longer hold."""
+        return self.removed | self.changed
+
+
+class RunState(BaseModel):
+    """What the last run of a tier worked from and wrote.
+
+    `roster` is the raid plan as Raider rows and `cells` the grid of every
+    boss range as it was written, so the next run can tell what changed
+    without fetching the sheet.
+    """
+    raid_id: int
+    sheet_id: str
+    config: RunConfig
+    roster: list[tuple]
+    cells: dict[str, list[list[str]]]
+
+    @classmethod
+    def load(cls, path: str = RUN_STATE_FILE) -> RunState | None:
+        if not os.path.exists(path):
+            return None
+        with open(path) as file:
+            return cls.model_validate_json(file.read())
+
+    def save(self, path: str = RUN_STATE_FILE) -> None:
+        with open(path, 'w') as file:
+            file.write(self.model_dump_json())
+
+    def diff(self, roster: RaidRoster) -> RosterDiff:
+        old = {raider.name: raider for raider in map(Raider.from_row, self.roster)}
+        new = {raider.name: raider for raider in roster}
+        both = old.keys() & new.keys()
+        # only class, spec and role move a raider, the colour only changes how the name is shown
+        return RosterDiff(
+            added=new.keys() - old.keys(),
+            removed=old.keys() - new.keys(),
+            changed={name for name in both if (old[name].wow_class, old[name].spec, old[name].role) != (new[name].wow_class, new[name].spec, new[name].role)},
+            recolored={name for name in both if old[name].color != new[name].color},
+        )
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the top of the repo, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import google_sheets  # noqa: E402
+from local_sheets import LocalSheetsBackend  # noqa: E402
+from roster import SPEC_INFO, RaidRoster, Raider  # noqa: E402
+
+
+def build_roster(*signups) -> RaidRoster:
+    """A roster in raid plan order from raid-helper spec names, or (name, spec, colour) tuples."""
+    raiders = []
+    for i, signup in enumerate(signups):
+        name, spec, color = (f'raider{i}', signup, '#ffffff') if isinstance(signup, str) else signup
+        role, wow_class, spec_name = SPEC_INFO[spec]
+        raiders.append(Raider(i // 5 + 1, i % 5 + 1, name, i, wow_class, spec_name, spec, role, color))
+    return RaidRoster(raiders=raiders)
+
+
+@pytest.fixture
+def make_roster():
+    return build_roster
+
+
+# a full raid with every class
+RAID = [
+    'Protection', 'Blood_Tank', 'Guardian', 'Restoration1', 'Holy1',
+    'Discipline', 'Restoration', 'Holy', 'Combat', 'Assassination',
+    'Arms', 'Fury', 'Frost_DPS', 'Unholy_DPS', 'Retribution',
+    'Enhancement', 'Feral', 'Fire', 'Arcane', 'Frost',
+    'Affliction', 'Destruction', 'Marksmanship', 'Shadow', 'Balance',
+]
+
+
+@pytest.fixture
+def raid() -> RaidRoster:
+    return build_roster(*RAID)
+
+
+@pytest.fixture
+def local_backend() -> LocalSheetsBackend:
+    """An in-memory sheet backend in place of Google Sheets for the test."""
+    backend = LocalSheetsBackend()
+    google_sheets.set_backend(backend)
+    yield backend
+    google_sheets.set_backend(None)
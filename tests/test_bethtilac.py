@@ -0,0 +1,31 @@
+from assignments.tier_12.bethtilac import MELEE_GROUPS, Bethtilac, soaker_count
+
+SIGNUPS = [
+    'Protection', 'Guardian',
+    'Restoration1', 'Holy1', 'Discipline', 'Restoration',
+    'Shadow', 'Balance', 'Fire', 'Affliction',
+    'Combat', 'Subtlety',
+    'Unholy_DPS', 'Frost_DPS', 'Feral', 'Arms', 'Fury', 'Retribution', 'Enhancement', 'Retribution',
+]
+
+
+def test_optimize_fills_every_position(make_roster):
+    boss = Bethtilac(roster=make_roster(*SIGNUPS))
+    boss.optimize()
+    assert boss.bethtilac_healer.class_and_spec == 'restoration shaman'
+    assert boss.drone_healer.class_and_spec == 'holy paladin'
+    assert sorted(raider.class_and_spec for raider in boss.drone_dps) == ['balance druid', 'shadow priest']
+    assert sorted(raider.class_and_spec for raider in boss.bethtilac_dps) == ['combat rogue', 'subtlety rogue']
+
+    groups = [getattr(boss, name) for name in MELEE_GROUPS]
+    placed = [raider for group in groups for raider in group]
+    assert len(placed) == len(set(placed)) == 8
+    assert all(soaker_count(group) for group in groups)
+    assert max(map(len, groups)) - min(map(len, groups)) <= 1
+
+
+def test_groups_are_not_shared_between_bosses(make_roster):
+    first = Bethtilac(roster=make_roster(*SIGNUPS))
+    first.optimize()
+    second = Bethtilac(roster=make_roster(*SIGNUPS))
+    assert not second.drone_dps and not second.melee_group_one
@@ -0,0 +1,167 @@
+import itertools
+import random
+
+import pytest
+
+from assignments.constraints import INFEASIBLE, GroupSolver, Unsatisfiable
+from assignments.tier_11.conclave import Conclave
+from roster import Role
+
+GROUPS = ['a', 'b', 'c']
+
+
+class Member:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+
+
+def random_instance(seed):
+    rnd = random.Random(seed)
+    capacities = {group: rnd.randint(1, 3) for group in GROUPS}
+    raiders = [Member(f'r{i}', rnd.choice('xyz')) for i in range(rnd.randint(1, 6))]
+    preferences = {(raider.name, group): rnd.choice([0, 1, 2, INFEASIBLE]) for raider in raiders for group in GROUPS}
+    size_costs = {group: sorted(rnd.choice([0, 1, 3]) for _ in range(3)) for group in GROUPS}
+    # (group, kind, at least, at most, weight)
+    constraints = []
+    if rnd.random() < 0.5:
+        constraints.append(('a', 'x', 1, None, None))
+    if rnd.random() < 0.5:
+        constraints.append(('b', 'y', 1, None, 5))
+    if rnd.random() < 0.5:
+        constraints.append(('c', 'z', 0, 1, None))
+    return capacities, raiders, preferences, size_costs, constraints
+
+
+def build_solver(capacities, preferences, size_costs, constraints):
+    solver = GroupSolver(capacities)
+    solver.prefer(lambda raider, group: preferences[raider.name, group])
+    for group, costs in size_costs.items():
+        solver.size_cost(group, costs)
+    for group, kind, at_least, at_most, weight in constraints:
+        predicate = lambda raider, kind=kind: raider.kind == kind
+        if at_most is not None:
+            solver.at_most(group, predicate, at_most)
+        else:
+            solver.at_least(group, predicate, at_least, weight=weight)
+    return solver
+
+
+def brute_force_cost(capacities, raiders, preferences, size_costs, constraints, assignment):
+    total = 0
+    for group in GROUPS:
+        members = [raider for raider, placed in zip(raiders, assignment) if placed == group]
+        if len(members) > capacities[group]:
+            return None
+        total += sum(size_costs[group][min(k, len(size_costs[group]) - 1)] for k in range(len(members)))
+    total += sum(preferences[raider.name, group] for raider, group in zip(raiders, assignment))
+    if total >= INFEASIBLE:
+        return None
+    for group, kind, at_least, at_most, weight in constraints:
+        count = sum(1 for raider, placed in zip(raiders, assignment) if placed == group and raider.kind == kind)
+        if at_most is not None and count > at_most:
+            return None
+        if count < at_least:
+            if weight is None:
+                return None
+            total += weight * (at_least - count)
+    return total
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_solver_is_optimal_on_small_instances(seed):
+    capacities, raiders, preferences, size_costs, constraints = instance = random_instance(seed)
+    costs = [brute_force_cost(*instance, assignment) for assignment in itertools.product(GROUPS, repeat=len(raiders))]
+    best = min((cost for cost in costs if cost is not None), default=None)
+    solver = build_solver(capacities, preferences, size_costs, constraints)
+    try:
+        groups = solver.solve(raiders)
+    except Unsatisfiable:
+        assert best is None
+        return
+    assignment = [next(group for group in GROUPS if raider in groups[group]) for raider in raiders]
+    assert brute_force_cost(*instance, assignment) == best
+
+
+def test_pinned_raiders_count_toward_constraints():
+    solver = GroupSolver({'a': 2, 'b': 2})
+    solver.pin('a', Member('pinned', 'x'))
+    solver.at_most('a', lambda raider: raider.kind == 'x', 1)
+    groups = solver.solve([Member('r0', 'x')])
+    assert [raider.name for raider in groups['b']] == ['r0']
+
+
+def test_unsatisfiable_names_the_hard_constraint():
+    solver = GroupSolver({'a': 2, 'b': 2})
+    solver.at_least('a', lambda raider: raider.kind == 'healer', name='healer on a')
+    with pytest.raises(Unsatisfiable) as error:
+        solver.solve([Member('r0', 'dps'), Member('r1', 'dps')])
+    assert error.value.constraint == 'healer on a'
+
+
+def test_unsatisfiable_blames_capacity_under_preferences():
+    # dps can't go on nezir, so they overflow the other two platforms whatever the healer limit
+    solver = GroupSolver({'anshal': 2, 'rohash': 2, 'nezir': 4})
+    solver.prefer(lambda raider, group: INFEASIBLE if group == 'nezir' and raider.kind == 'dps' else 0)
+    solver.at_most('nezir', lambda raider: raider.kind == 'healer', 2, name='nezir healers')
+    raiders = [Member(f'dps{i}', 'dps') for i in range(5)] + [Member('healer', 'healer')]
+    with pytest.raises(Unsatisfiable) as error:
+        solver.solve(raiders)
+    assert error.value.constraint == 'capacity'
+    assert 'anshal, rohash' in str(error.value)
+
+
+def test_unsatisfiable_when_a_raider_fits_nowhere():
+    solver = GroupSolver({'a': 1})
+    solver.prefer(lambda raider, group: INFEASIBLE)
+    with pytest.raises(Unsatisfiable) as error:
+        solver.solve([Member('r0', 'x')])
+    assert error.value.constraint == 'preferences'
+
+
+def large_instance(seed, **budget):
+    rnd = random.Random(seed)
+    raiders = [Member(f'r{i}', rnd.choice('xyz')) for i in range(30)]
+    costs = {(raider.name, group): rnd.randint(0, 5) for raider in raiders for group in GROUPS}
+    solver = GroupSolver({group: 10 for group in GROUPS}, **budget)
+    solver.prefer(lambda raider, group: costs[raider.name, group])
+    solver.at_least('a', lambda raider: raider.kind == 'x', 4, weight=5)
+    solver.at_most('c', lambda raider: raider.kind == 'z', 3)
+    return solver, raiders
+
+
+def names(groups):
+    return {group: [raider.name for raider in raiders] for group, raiders in groups.items()}
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_budgeted_search_is_deterministic(seed):
+    solver, raiders = large_instance(seed, node_limit=200)
+    again, _ = large_instance(seed, node_limit=200)
+    assert names(solver.solve(raiders)) == names(again.solve(raiders))
+
+
+@pytest.mark.parametrize('seed', range(2))
+def test_polish_improves_on_a_cut_off_search(seed):
+    cut_off, raiders = large_instance(seed, node_limit=50, polish_steps=0)
+    polished, _ = large_instance(seed, node_limit=50)
+    assert polished.model().score(polished.solve(raiders)) < cut_off.model().score(cut_off.solve(raiders))
+
+def test_pinned_raiders_over_a_limit_loosen_it():
+    solver = GroupSolver({'a': 4, 'b': 4})
+    for i in range(3):
+        solver.pin('a', Member(f'pinned{i}', 'healer'))
+    solver.at_most('a', lambda raider: raider.kind == 'healer', 2, name='healers on a')
+    groups = solver.solve([Member('healer', 'healer'), Member('dps', 'dps')])
+    assert 'healer' in [raider.name for raider in groups['b']]
+    assert solver.model().score(groups) < INFEASIBLE
+
+
+def test_conclave_keeps_extra_healers_put_on_nezir_by_hand(raid):
+    boss = Conclave(roster=raid.overlay())
+    for healer in list(raid.get_healers())[:3]:
+        boss.nezir.append(healer)
+        boss.roster.set_position(healer)
+    boss.optimize()
+    assert sum(raider.role == Role.HEALERS for raider in boss.nezir) == 3
+    assert sum(len(getattr(boss, platform)) for platform in ['anshal', 'rohash', 'nezir']) == len(raid.raiders)
@@ -0,0 +1,54 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from assignments.cooldowns import CooldownScheduler, IntervalSet
+from roster import RaidCooldown
+
+
+def cooldown(name, spell='spirit link', cooldown=180, duration=6, stacks=False):
+    return RaidCooldown(SimpleNamespace(name=name), spell, cooldown, duration, stacks)
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_interval_set_overlaps_like_a_scan(seed):
+    rnd = random.Random(seed)
+    intervals = IntervalSet()
+    added = []
+    for _ in range(20):
+        start = rnd.randint(0, 100)
+        end = start + rnd.randint(1, 10)
+        expected = any(start < other_end and other_start < end for other_start, other_end in added)
+        assert intervals.overlaps(start, end) == expected
+        if not expected:
+            intervals.add(start, end)
+            added.append((start, end))
+
+
+def test_a_cooldown_is_busy_until_it_is_ready_again():
+    scheduler = CooldownScheduler([cooldown('anna', cooldown=180)])
+    rotation = scheduler.schedule([0, 120, 180, 300, 360])
+    assert [len(casts) for casts in rotation] == [1, 0, 1, 0, 1]
+
+
+def test_casts_of_a_spell_that_does_not_stack_do_not_overlap():
+    scheduler = CooldownScheduler([cooldown('anna', duration=10), cooldown('bert', duration=10)])
+    assert [len(casts) for casts in scheduler.schedule([0, 5, 10])] == [1, 0, 1]
+    stacking = CooldownScheduler([cooldown('anna', stacks=True), cooldown('bert', stacks=True)])
+    assert [len(casts) for casts in stacking.schedule([0], per_event=2)] == [2]
+
+
+def test_casts_spread_over_everyone_with_the_cooldown():
+    cooldowns = [cooldown(name, cooldown=60, duration=0) for name in ['anna', 'bert', 'cara']]
+    rotation = CooldownScheduler(cooldowns).schedule([0, 60, 120])
+    assert [casts[0].raider.name for casts in rotation] == ['anna', 'bert', 'cara']
+
+
+def test_pinned_casts_block_the_schedule():
+    anna = cooldown('anna', cooldown=180)
+    scheduler = CooldownScheduler([anna])
+    scheduler.pin(anna, 100)
+    assert scheduler.schedule([0, 200, 280]) == [(), (), (anna,)]
+    with pytest.raises(ValueError):
+        scheduler.pin(anna, 300)
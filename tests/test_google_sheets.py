@@ -0,0 +1,116 @@
+import random
+import threading
+from unittest import mock
+
+import httplib2
+import pytest
+from googleapiclient.errors import HttpError
+
+import google_sheets
+from google_sheets import GoogleSheetsBackend, RequestScheduler, SheetsClient
+
+
+def run_with_timeout(function, timeout=5):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', function()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'call did not return'
+    return result['value']
+
+
+def test_first_request_builds_client_and_executes():
+    credentials = mock.MagicMock(valid=True)
+    service = mock.MagicMock()
+    request = service.spreadsheets.return_value.values.return_value.batchGet.return_value
+    request.execute.return_value = {'valueRanges': [{'values': [['a', 'b']]}]}
+    with mock.patch.object(google_sheets, 'get_credentials', return_value=credentials) as get_credentials, \
+            mock.patch.object(google_sheets, 'build', return_value=service) as build:
+        backend = GoogleSheetsBackend(SheetsClient(), RequestScheduler({'read': [], 'write': []}))
+        grids = run_with_timeout(lambda: backend.batch_get('sheet', ['A!A1:B1']))
+    assert grids == [[['a', 'b']]]
+    get_credentials.assert_called_once()
+    build.assert_called_once()
+    assert request.execute.call_args.kwargs['http'] is not None
+    batch_get = service.spreadsheets.return_value.values.return_value.batchGet
+    assert batch_get.call_args.kwargs['valueRenderOption'] == 'FORMULA'
+
+
+def apply_ranges(cell_range, grid, changes):
+    _, start_row, start_column, _, _ = google_sheets.parse_range(cell_range)
+    grid = [row[:] for row in grid]
+    for sub_range, cells in changes:
+        _, row, column, end_row, end_column = google_sheets.parse_range(sub_range)
+        assert (end_row - row, end_column - column) == (len(cells), len(cells[0]))
+        for i, values in enumerate(cells):
+            for j, value in enumerate(values):
+                grid[row - start_row + i][column - start_column + j] = value
+    return grid
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_changed_ranges_round_trip(seed):
+    rnd = random.Random(seed)
+    cell_range = "'Sheet One'!C5:J12"
+    old = [[rnd.choice(['', 'a', 'b']) for _ in range(8)] for _ in range(8)]
+    new = [[value if rnd.random() < 0.7 else rnd.choice(['', 'a', 'b', 'c']) for value in row] for row in old]
+    changes = google_sheets.changed_ranges(cell_range, old, new)
+    assert apply_ranges(cell_range, old, changes) == new
+    changed = sum(old[i][j] != new[i][j] for i in range(8) for j in range(8))
+    assert sum(len(cells) * len(cells[0]) for _, cells in changes) == changed
+
+
+def test_changed_ranges_is_empty_for_equal_grids():
+    grid = [['a', 'b'], ['c', 'd']]
+    assert google_sheets.changed_ranges('A1:B2', grid, [row[:] for row in grid]) == []
+
+
+def http_error(status):
+    return HttpError(httplib2.Response({'status': status}), b'')
+
+
+def failing(statuses, result='done'):
+    """A call that fails with each of `statuses` in turn, then returns `result`."""
+    calls = []
+
+    def call():
+        calls.append(None)
+        if len(calls) <= len(statuses):
+            raise http_error(statuses[len(calls) - 1])
+        return result
+    return call, calls
+
+
+@pytest.fixture
+def scheduler():
+    with mock.patch.object(google_sheets.time, 'sleep'):
+        yield RequestScheduler({'read': [], 'write': []}, max_retries=3)
+
+
+@pytest.mark.parametrize('status', [429, 500, 503])
+def test_idempotent_calls_retry_retryable_statuses(scheduler, status):
+    call, calls = failing([status, status])
+    assert scheduler.run('write', call) == 'done'
+    assert len(calls) == 3
+
+
+def test_non_idempotent_calls_only_retry_429(scheduler):
+    call, calls = failing([429])
+    assert scheduler.run('write', call, idempotent=False) == 'done'
+    assert len(calls) == 2
+    for status in [500, 503]:
+        call, calls = failing([status])
+        with pytest.raises(HttpError):
+            scheduler.run('write', call, idempotent=False)
+        assert len(calls) == 1
+
+
+def test_other_statuses_and_exhausted_retries_raise(scheduler):
+    call, calls = failing([400])
+    with pytest.raises(HttpError):
+        scheduler.run('read', call)
+    assert len(calls) == 1
+    call, calls = failing([429] * 4)
+    with pytest.raises(HttpError):
+        scheduler.run('read', call)
+    assert len(calls) == 4
@@ -0,0 +1,29 @@
+import pytest
+
+from assignments.cache import SolutionCache
+from assignments.tier_11.alakir import AlAkir
+from assignments.tier_11.chimaeron import Chimaeron
+from assignments.tier_11.conclave import Conclave
+from assignments.tier_12.shannox import Shannox
+
+
+def solve(Boss, roster, cells, cache):
+    boss = Boss(roster=roster.overlay())
+    table = boss.table()
+    boss.solve({table.range: cells}, cache)
+    return boss, [row[:] for row in boss.render()]
+
+
+@pytest.mark.parametrize('Boss', [AlAkir, Chimaeron, Conclave, Shannox])
+def test_cache_hit_writes_what_the_miss_did(Boss, raid, tmp_path):
+    cache = SolutionCache(str(tmp_path / 'cache.sqlite'))
+    _, filled = solve(Boss, raid, Boss.table().blank(), cache)
+    # the first run on the filled sheet is a miss, the second replays it
+    _, missed = solve(Boss, raid, filled, cache)
+    boss, hit = solve(Boss, raid, filled, cache)
+    assert hit == missed
+    table = boss.table()
+    for name, group in table.groups.items():
+        assert len(getattr(boss, name)) <= group.size
+    placed = [raider for name in table.groups for raider in getattr(boss, name)]
+    assert len(placed) == len(set(placed))
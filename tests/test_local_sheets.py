@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+import google_sheets
+from google_sheets import SheetBackend, sync_conditional_formats
+
+
+def rule(gid, color, names):
+    formula = ','.join(f'A1="{name}"' for name in names)
+    return {
+        'ranges': [{'sheetId': int(gid), 'startRowIndex': 0, 'endRowIndex': 300, 'startColumnIndex': 0, 'endColumnIndex': 200}],
+        'booleanRule': {
+            'condition': {'type': 'CUSTOM_FORMULA', 'values': [{'userEnteredValue': f'=OR({formula})'}]},
+            'format': {'backgroundColor': {'red': color[0], 'green': color[1], 'blue': color[2]}},
+        },
+    }
+
+
+def random_rules(rnd, gid):
+    colors = [(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (0, 1, 1)]
+    names = [f'raider{i}' for i in range(8)]
+    return [rule(gid, color, sorted(rnd.sample(names, rnd.randint(1, 3)))) for color in rnd.sample(colors, rnd.randint(0, len(colors)))]
+
+
+def keys(rules):
+    return sorted(google_sheets._rule_key(rule) for rule in rules)
+
+
+def test_backend_missing_a_method_fails_to_construct():
+    class Partial(SheetBackend):
+        def batch_get(self, sheet_id, ranges):
+            return []
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_sync_conditional_formats_round_trip(local_backend, seed):
+    rnd = random.Random(seed)
+    for _ in range(3):
+        wanted = {gid: random_rules(rnd, gid) for gid in ['0', '7']}
+        before = local_backend.get_conditional_formats('sheet')
+        sync_conditional_formats('sheet', wanted)
+        after = local_backend.get_conditional_formats('sheet')
+        for gid, rules in wanted.items():
+            assert keys(after.get(gid, [])) == keys(rules)
+            # rules that were already there are kept, not deleted and added again
+            kept = [google_sheets._rule_key(rule) for rule in before.get(gid, []) if google_sheets._rule_key(rule) in keys(rules)]
+            assert [google_sheets._rule_key(rule) for rule in after.get(gid, [])][:len(kept)] == kept
+
+
+def test_sync_leaves_unlisted_sheets_alone(local_backend):
+    sync_conditional_formats('sheet', {'0': [rule('0', (1, 0, 0), ['a'])], '7': [rule('7', (0, 1, 0), ['b'])]})
+    sync_conditional_formats('sheet', {'0': []})
+    rules = local_backend.get_conditional_formats('sheet')
+    assert rules.get('0') == []
+    assert keys(rules['7']) == keys([rule('7', (0, 1, 0), ['b'])])
+
@@ -0,0 +1,28 @@
+import itertools
+import random
+
+import pytest
+
+from assignments.matching import INFEASIBLE, min_cost_assignment
+
+
+@pytest.mark.parametrize('seed', range(200))
+def test_min_cost_assignment_matches_brute_force(seed):
+    rnd = random.Random(seed)
+    rows = rnd.randint(1, 5)
+    columns = rnd.randint(rows, 6)
+    costs = [[rnd.choice([0, 1, 2, 3, 5, 8]) for _ in range(columns)] for _ in range(rows)]
+    picked = min_cost_assignment(costs)
+    assert len(set(picked)) == rows
+    best = min(sum(costs[i][j] for i, j in enumerate(columns_picked)) for columns_picked in itertools.permutations(range(columns), rows))
+    assert sum(costs[i][j] for i, j in enumerate(picked)) == best
+
+
+def test_min_cost_assignment_rejects_infeasible_matchings():
+    with pytest.raises(ValueError):
+        min_cost_assignment([[0, INFEASIBLE], [0, INFEASIBLE]])
+
+
+def test_min_cost_assignment_rejects_more_rows_than_columns():
+    with pytest.raises(ValueError):
+        min_cost_assignment([[0], [0]])
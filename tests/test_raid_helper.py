@@ -0,0 +1,30 @@
+import pytest
+
+from raid_helper import RaidPlanCache, serve_raid_plans
+
+
+@pytest.fixture
+def plans():
+    plans = {}
+    server = serve_raid_plans(plans)
+    yield plans, f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def test_cache_revalidates_and_picks_up_changes(plans, tmp_path):
+    plans, url = plans
+    plans[1] = {'raidDrop': [{'name': 'One'}]}
+    cache = RaidPlanCache(directory=str(tmp_path), ttl=0, base_url=url)
+    assert cache.get(1) == plans[1]
+    # unchanged, answered with a 304
+    assert cache.get(1) == {'raidDrop': [{'name': 'One'}]}
+    plans[1] = {'raidDrop': [{'name': 'Two'}]}
+    assert cache.get(1) == plans[1]
+    # a new cache reads the saved entry from disk
+    assert RaidPlanCache(directory=str(tmp_path), ttl=60, base_url='http://127.0.0.1:9').get(1) == plans[1]
+
+
+def test_unknown_raid_raises(plans, tmp_path):
+    _, url = plans
+    with pytest.raises(Exception):
+        RaidPlanCache(directory=str(tmp_path), ttl=0, base_url=url).get(2)
@@ -0,0 +1,57 @@
+import pytest
+
+from assignments.runner import update_tier
+from roster import RaidRoster
+from run_config import RunConfig
+from run_state import RunState
+
+TANK = ('tank', 'Protection', '#ffffff')
+
+
+def make_state(roster: RaidRoster) -> RunState:
+    return RunState(raid_id=1, sheet_id='sheet', config=RunConfig(), roster=roster.to_rows(), cells={})
+
+
+def test_diff_reports_colour_apart_from_changes(make_roster):
+    state = make_state(make_roster(TANK, ('anna', 'Fire', '#ff0000')))
+    diff = state.diff(make_roster(TANK, ('other', 'Holy', '#ffffff'), ('anna', 'Fire', '#00ff00')))
+    assert diff.added == {'other'}
+    assert diff.recolored == {'anna'}
+    assert not diff.changed and not diff.removed and not diff.released
+
+
+def test_diff_reports_spec_and_role_changes(make_roster):
+    state = make_state(make_roster(TANK, ('anna', 'Fire', '#ff0000'), ('bert', 'Shadow', '#ffffff'), ('cara', 'Arms', '#ffffff')))
+    diff = state.diff(make_roster(TANK, ('anna', 'Frost', '#ff0000'), ('bert', 'Holy', '#ffffff')))
+    assert diff.changed == {'anna', 'bert'}
+    assert diff.removed == {'cara'}
+    assert diff.released == {'anna', 'bert', 'cara'}
+
+
+def test_diff_survives_a_save(make_roster, tmp_path):
+    path = str(tmp_path / 'run_state.json')
+    make_state(make_roster(TANK, ('anna', 'Fire', '#ff0000'))).save(path)
+    assert not RunState.load(path).diff(make_roster(TANK, ('anna', 'Fire', '#ff0000')))
+
+
+@pytest.fixture
+def signups(monkeypatch):
+    """The raid plan update_tier fetches, set by the test."""
+    plan = {}
+    monkeypatch.setattr(RaidRoster, 'from_raid_plan', classmethod(lambda cls, raid_id, config=None: plan['roster']))
+    return plan
+
+
+def test_update_tier_pushes_colour_changes(local_backend, make_roster, signups, tmp_path):
+    state_file = str(tmp_path / 'run_state.json')
+
+    def colours():
+        rules = local_backend.get_conditional_formats('sheet')['0']
+        return sorted(tuple(rule['booleanRule']['format']['backgroundColor'].values()) for rule in rules)
+
+    signups['roster'] = make_roster(TANK, ('anna', 'Fire', '#ff0000'))
+    update_tier(1, 'sheet', [], gids=['0'], state_file=state_file)
+    assert colours() == [(0, 1, 0), (1, 1, 1)]
+    signups['roster'] = make_roster(TANK, ('anna', 'Fire', '#0000ff'))
+    update_tier(1, 'sheet', [], gids=['0'], state_file=state_file)
+    assert colours() == [(0, 0, 1), (1, 1, 1)]
@@ -0,0 +1,78 @@
+import math
+import random
+
+import pytest
+
+from assignments.scoring import INFEASIBLE, CountTerm, LocalSearch, ScoreModel
+
+GROUPS = ['a', 'b', 'c']
+
+
+class Member:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+
+
+def random_search(seed):
+    rnd = random.Random(seed)
+    raiders = [Member(f'r{i}', rnd.choice('xyz')) for i in range(rnd.randint(2, 12))]
+    preferences = {(raider.name, group): rnd.choice([0, 1, 2, 5]) for raider in raiders for group in GROUPS}
+    terms = [
+        CountTerm('x', lambda raider: raider.kind == 'x', [rnd.choice([0, 10]), 0, rnd.choice([0, 3])]),
+        CountTerm('y on a', lambda raider: raider.kind == 'y', [0, 0, rnd.choice([4, INFEASIBLE])], ('a',)),
+        CountTerm('size', lambda raider: True, [k * k for k in range(20)]),
+    ]
+    pinned = {'b': [Member('pinned', rnd.choice('xyz'))]}
+    model = ScoreModel({group: 8 for group in GROUPS}, lambda raider, group: preferences[raider.name, group], terms, pinned)
+    while True:
+        grouping = {group: [] for group in GROUPS}
+        for raider in raiders:
+            grouping[rnd.choice(GROUPS)].append(raider)
+        if model.score(grouping) < INFEASIBLE:
+            return rnd, model, LocalSearch(model, grouping, seed=seed)
+
+
+def moved(search, placement):
+    """The search's grouping with raider i in group g for every (i, g) in `placement`."""
+    groups = list(search.group)
+    for i, g in placement:
+        groups[i] = g
+    grouping = {group: [] for group in GROUPS}
+    for raider, g in zip(search.raiders, groups):
+        grouping[GROUPS[g]].append(raider)
+    return grouping
+
+
+@pytest.mark.parametrize('seed', range(100))
+def test_deltas_match_rescoring(seed):
+    rnd, model, search = random_search(seed)
+    n = len(search.raiders)
+    for _ in range(50):
+        before = model.score(search.grouping())
+        i, j, g = rnd.randrange(n), rnd.randrange(n), rnd.randrange(len(GROUPS))
+        if rnd.random() < 0.5:
+            delta = search.move_delta(i, g)
+            after = model.score(moved(search, [(i, g)]))
+            apply = lambda: search.move(i, g, delta)
+        else:
+            delta = search.swap_delta(i, j)
+            after = model.score(moved(search, [(i, search.group[j]), (j, search.group[i])]))
+            apply = lambda: search.swap(i, j, delta)
+        if after == INFEASIBLE:
+            assert delta == INFEASIBLE
+            continue
+        assert math.isclose(after - before, delta, abs_tol=1e-9)
+        apply()
+        assert math.isclose(search.score, after, abs_tol=1e-9)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_run_is_deterministic_and_never_worse(seed):
+    _, model, search = random_search(seed)
+    start = model.score(search.grouping())
+    first = search.run(2000)
+    _, _, again = random_search(seed)
+    names = lambda grouping: {group: [raider.name for raider in raiders] for group, raiders in grouping.items()}
+    assert names(again.run(2000)) == names(first)
+    assert model.score(first) <= start
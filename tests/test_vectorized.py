@@ -0,0 +1,59 @@
+import random
+
+import numpy as np
+import pytest
+
+from assignments.scoring import INFEASIBLE, CountTerm, ScoreModel
+from assignments.vectorized import BatchScorer, RosterFeatures
+
+GROUPS = ['a', 'b', 'c']
+
+
+class Member:
+    def __init__(self, name, kind):
+        self.name = name
+        self.kind = kind
+
+
+def random_model(rnd):
+    raiders = [Member(f'r{i}', rnd.choice('xyz')) for i in range(rnd.randint(2, 12))]
+    preferences = {(raider.name, group): rnd.choice([0, 1, 2, 5]) for raider in raiders for group in GROUPS}
+    terms = [
+        CountTerm('x', lambda raider: raider.kind == 'x', [rnd.choice([0, 10]), 0, rnd.choice([0, 3])]),
+        CountTerm('y on a', lambda raider: raider.kind == 'y', [0, 0, rnd.choice([4, INFEASIBLE])], ('a',)),
+        CountTerm('size', lambda raider: True, [k * k for k in range(20)]),
+    ]
+    pinned = {'b': [Member('pinned', rnd.choice('xyz'))]}
+    capacities = {group: rnd.randint(2, 6) for group in GROUPS}
+    return ScoreModel(capacities, lambda raider, group: preferences[raider.name, group], terms, pinned), raiders
+
+
+@pytest.mark.parametrize('seed', range(50))
+def test_batch_scores_match_the_model(seed):
+    rnd = random.Random(seed)
+    model, raiders = random_model(rnd)
+    scorer = BatchScorer(model, raiders)
+    batch = np.array([[rnd.randint(-1, len(GROUPS) - 1) for _ in raiders] for _ in range(20)])
+    for row, score in zip(batch, scorer.score(batch)):
+        grouping = scorer.decode(row)
+        over = any(len(grouping[group]) + len(model.pinned.get(group, [])) > model.capacities[group] for group in GROUPS)
+        assert score == (INFEASIBLE if over else model.score(grouping))
+        assert (scorer.encode(grouping) == row).all()
+
+
+def test_overrides_change_matches_per_candidate():
+    raiders = [Member('r0', 'x'), Member('r1', 'y'), Member('r2', 'z')]
+    model = ScoreModel({'a': 3, 'b': 3}, lambda raider, group: 0, [CountTerm('x', lambda raider: raider.kind == 'x', [10, 0, 0, 5], ('a',))], {})
+    scorer = BatchScorer(model, raiders)
+    batch = np.zeros((3, len(raiders)), dtype=int)
+    overrides = np.array([[True, False, False], [False, False, False], [True, True, True]])
+    assert scorer.score(batch).tolist() == [0, 0, 0]
+    assert scorer.score(batch, {'x': overrides}).tolist() == [0, 10, 5]
+
+
+def test_flex_healers_count_as_healers(raid):
+    features = RosterFeatures.from_raiders(raid)
+    healers = features.healers([(), ('raider23',), ('raider23', 'raider24', 'benched')])
+    assert healers.shape == (3, len(raid.raiders))
+    assert healers.sum(axis=1).tolist() == [5, 6, 7]
+    assert healers[1, 23] and not healers[0, 23]
@@ -0,0 +1,84 @@
+import math
+
+import numpy as np
+import pytest
+
+from assignments.tier_11.alakir import AlAkir
+from assignments.tier_11.chimaeron import Chimaeron
+from assignments.tier_11.conclave import Conclave
+from assignments.tier_12.bethtilac import Bethtilac
+from assignments.tier_12.shannox import Shannox
+from assignments.whatif import Variant, VariantResult, estimate, rank, relative, roster_variants, run_variant, shortlist
+from run_config import RunConfig
+
+BOSSES = [AlAkir, Chimaeron, Conclave]
+# raid fixture names
+HOLY = 'raider7'
+SHADOW = 'raider23'
+BALANCE = 'raider24'
+
+
+def test_variant_config_counts_flex_healers_for_bosses_that_take_them():
+    config = RunConfig(bosses={'alakir': {'flex_healers': 5}, 'bethtilac': {'other': 1}})
+    variant = Variant(flex_healers=(SHADOW, BALANCE))
+    updated = variant.config(config, [AlAkir, Chimaeron, Conclave, Shannox, Bethtilac])
+    assert updated.flex_healers == [SHADOW, BALANCE]
+    assert updated.boss_options(AlAkir) == {'flex_healers': 2}
+    assert updated.boss_options(Chimaeron) == {'flex_healers': 2}
+    assert updated.boss_options(Conclave) == {'flex_healers': 2}
+    assert updated.boss_options(Shannox) == {'flex_healers': 2}
+    assert updated.boss_options(Bethtilac) == {'other': 1}
+    # the config itself is left alone
+    assert config.boss_options(AlAkir) == {'flex_healers': 5}
+
+
+def test_flex_healers_change_the_scores(raid):
+    rows = raid.to_rows()
+    config = RunConfig().model_dump_json()
+    without = run_variant(rows, config, BOSSES, None, Variant(bench=(HOLY,)))
+    with_flex = run_variant(rows, config, BOSSES, None, Variant(bench=(HOLY,), flex_healers=(SHADOW, BALANCE)))
+    assert without.error is None and with_flex.error is None
+    assert with_flex.scores != without.scores
+    assert sum(with_flex.scores.values()) < sum(without.scores.values())
+
+
+def test_relative_puts_every_boss_on_the_same_scale():
+    assert relative(np.array([10, 20, 30])).tolist() == [0, 0.5, 1]
+    assert relative(np.array([5, 5])).tolist() == [0, 0]
+    assert relative(np.array([1, math.inf, 3])).tolist() == [0, 1, 1]
+    assert relative(np.array([math.inf])).tolist() == [1]
+
+
+def test_rank_adds_relative_scores_not_raw_ones():
+    results = [
+        # far ahead on the boss with the big scale
+        VariantResult(Variant(('a',)), {'big': 1000, 'small': 3}),
+        # ahead on both by a little
+        VariantResult(Variant(('b',)), {'big': 1010, 'small': 1}),
+        VariantResult(Variant(('c',)), {'big': 2000, 'small': 2}),
+        VariantResult(Variant(('d',)), error='AlAkir: no grouping'),
+    ]
+    ranked = rank(results)
+    assert [result.variant.bench for result in ranked] == [('b',), ('a',), ('c',), ('d',)]
+    assert ranked[0].relative == pytest.approx({'big': 0.01, 'small': 0})
+    assert ranked[-1].total == math.inf
+
+
+def test_estimate_prefers_flexing_in_for_a_benched_healer(raid):
+    variants = roster_variants([HOLY], 1, [SHADOW, BALANCE])
+    guesses = estimate(raid, BOSSES, variants)
+    assert guesses.shape == (len(variants),)
+    by_variant = dict(zip(variants, guesses))
+    assert by_variant[Variant((HOLY,), (SHADOW, BALANCE))] < by_variant[Variant((HOLY,))]
+
+
+def test_estimate_skips_bosses_without_a_solver(raid):
+    variants = roster_variants([HOLY], 1, [SHADOW])
+    assert estimate(raid, [Shannox], variants).tolist() == [0, 0]
+
+
+def test_shortlist_keeps_ties():
+    variants = [Variant((name,)) for name in 'abcde']
+    assert shortlist(variants, np.array([3, 1, 2, 2, 4]), 2) == [variants[1], variants[2], variants[3]]
+    assert shortlist(variants, np.array([3, 1, 2, 2, 4]), 1) == [variants[1]]
+    assert shortlist(variants, np.zeros(5), 10) == variants